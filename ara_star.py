@@ -0,0 +1,191 @@
+"""
+
+"""
+
+import time
+
+from board import encode_state, get_move_table, get_tile_bits, is_solvable
+from frontier import create_frontier
+from heuristic import get_heuristic
+from node import Node, get_sequence_of_actions
+from result import CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE, SearchResult
+
+
+class AnytimeSearch:
+
+    def __init__(self, initial_weight=3.0, weight_step=0.5, time_limit=None, on_solution=None, node_limit=None,
+                 cancel_event=None):
+        self.initial_weight = initial_weight  # the weight of the first search, the first solution comes fast
+        self.weight_step = weight_step  # how much the weight is lowered after each solution
+        self.time_limit = time_limit    # stop after this many seconds with the best solution so far, None for no limit
+        self.on_solution = on_solution  # called with (actions, cost, bound) for every better solution, None for none
+        self.node_limit = node_limit    # stop after this many nodes are expanded with the best solution so far
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of nodes expanded over all searches
+        self.depth = 0                  # the depth of the best goal node
+        self.bound = None               # the best solution costs at most bound times the optimal cost
+        self.solutions = []             # (seconds, cost, bound) of every better solution, in the order found
+
+        self.weight = initial_weight    # the weight of the current search
+        self.frontier = None            # open nodes by g(n) + weight * h(n)
+        self.explored_set = set()       # the states expanded by the current search
+        self.inconsistent = {}          # state key -> node, states that got cheaper after they were expanded
+        self.nodes = {}                 # state key -> the node with the lowest g(n) so far
+        self.goal_node = None           # the best goal node so far
+        self.deadline = None            # the time the search has to stop by
+        self.stop_status = None         # the status of the limit that stopped the last search, see result.py
+
+    # anytime repairing A* (ARA*, Likhachev, Gordon and Thrun 2003)
+    #   - a weighted A* search gives a first solution quickly, then the weight is lowered step by step and the
+    #     search goes on with the nodes it already has, only the states that got cheaper are searched again
+    #   - each better solution is reported through on_solution with its cost and its suboptimality bound, the
+    #     bound uses the lowest g(n) + h(n) of the open nodes, so it can be tighter than the weight
+    #   - stops when the solution is known to be optimal (bound 1) or at a limit (time, nodes expanded or the cancel
+    #     event), with the best solution
+    #   - returns a search result with the best solution and its bound
+    def solve(self, initial_state, goal_state, algorithm_choice):
+        start_time = time.perf_counter()
+        self.deadline = None if self.time_limit is None else start_time + self.time_limit
+        self.num_nodes_expanded = 0
+        self.solutions = []
+        self.goal_node = None
+        self.bound = None
+
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return SearchResult(UNSOLVABLE)
+
+        length = len(goal_state)
+        bits = get_tile_bits(length)
+        goal_key = encode_state(goal_state, bits)
+        heuristic = get_heuristic(algorithm_choice, length, goal_state)
+        move_table = get_move_table(length)
+
+        root = Node()
+        root.set_data(list(initial_state))
+        root.calculate_estimated_cost(algorithm_choice, 0, tuple(goal_state))
+
+        self.weight = self.initial_weight
+        self.nodes = {root.get_key(): root}
+        self.inconsistent = {}
+        self.explored_set = set()
+        self.frontier = create_frontier("heap")
+        self.frontier.push(root.get_key(), self.get_priority(root), root)
+
+        while True:
+            finished = self.improve_path(goal_key, move_table, bits, heuristic)
+            if self.goal_node is None:
+                self.status = NOT_FOUND if finished else self.stop_status
+                break
+
+            bound = self.get_bound(finished)
+            if not self.solutions or self.goal_node.path_cost < self.solutions[-1][1] or bound < self.bound:
+                self.report_solution(time.perf_counter() - start_time, bound)
+
+            self.status = SOLVED
+            if not finished or bound <= 1:
+                break
+
+            # lower the weight, the states that got cheaper join the open nodes, which are ordered again
+            self.weight = max(1, self.weight - self.weight_step)
+            self.reorder_frontier()
+
+        seconds = time.perf_counter() - start_time
+        if self.goal_node is None:
+            return SearchResult(self.status, None, self.num_nodes_expanded, seconds)
+        return SearchResult(self.status, get_sequence_of_actions(self.goal_node), self.num_nodes_expanded,
+                            seconds, bound=self.bound)
+
+    # weighted A* from the current open nodes, until no open node can lead to a cheaper goal node
+    #   - a state that gets cheaper after it was expanded is put aside as inconsistent, it is searched again
+    #     by the next search with a lower weight
+    #   - returns False if a limit was reached, stop_status says which one, the node limit is checked before each
+    #     expansion, the time limit and the cancel event every 1024 expansions
+    def improve_path(self, goal_key, move_table, bits, heuristic):
+        frontier = self.frontier
+        nodes = self.nodes
+
+        while len(frontier):
+            goal_cost = float("inf") if self.goal_node is None else self.goal_node.path_cost
+            if goal_cost <= frontier.peek_priority():
+                return True
+
+            if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+                self.stop_status = NODE_LIMIT
+                return False
+            if (self.num_nodes_expanded & 1023) == 0:
+                if self.deadline is not None and time.perf_counter() > self.deadline:
+                    self.stop_status = TIMEOUT
+                    return False
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.stop_status = CANCELLED
+                    return False
+
+            node = frontier.pop()
+            key = node.get_key()
+            self.explored_set.add(key)
+            self.num_nodes_expanded += 1
+
+            if key == goal_key:
+                if self.goal_node is None or node.path_cost < self.goal_node.path_cost:
+                    self.goal_node = node
+                continue
+
+            reverse_move = node.move ^ 1
+            for target_index, move in move_table[node.blank_index]:
+                if move == reverse_move:
+                    continue
+
+                child = node.create_child(target_index, move, bits, heuristic)
+                child_key = child.get_key()
+                known = nodes.get(child_key)
+                if known is not None and known.path_cost <= child.path_cost:
+                    continue
+
+                nodes[child_key] = child
+                if child_key == goal_key and (self.goal_node is None or child.path_cost < self.goal_node.path_cost):
+                    self.goal_node = child
+
+                if child_key in self.explored_set:
+                    self.inconsistent[child_key] = child
+                else:
+                    frontier.push(child_key, self.get_priority(child), child)
+
+        return True
+
+    # get the priority of a node, g(n) + weight * h(n)
+    def get_priority(self, node):
+        return node.path_cost + self.weight * node.heuristic_cost
+
+    # get the suboptimality bound of the best solution, its cost over the lowest g(n) + h(n) that is still open
+    #   - a finished search also bounds it by its weight, a search stopped by a limit by the bound of
+    #     the last solution, which cost more
+    def get_bound(self, finished):
+        lowest = min((node.estimated_cost for node in self.frontier.nodes()), default=float("inf"))
+        for node in self.inconsistent.values():
+            lowest = min(lowest, node.estimated_cost)
+
+        bound = self.goal_node.path_cost / lowest if lowest > 0 else float("inf")
+        limit = self.weight if finished else (self.bound or float("inf"))
+        return max(1.0, min(limit, bound))
+
+    # move the inconsistent states into the open nodes and order all of them by the new weight
+    #   - the explored set starts empty, every state can be expanded again by the next search
+    def reorder_frontier(self):
+        open_nodes = list(self.frontier.nodes()) + list(self.inconsistent.values())
+        self.frontier = create_frontier("heap")
+        for node in open_nodes:
+            self.frontier.push(node.get_key(), self.get_priority(node), node)
+
+        self.inconsistent = {}
+        self.explored_set = set()
+
+    # keep a better solution and report it
+    def report_solution(self, seconds, bound):
+        self.bound = bound
+        self.depth = self.goal_node.path_cost
+        self.solutions.append((seconds, self.goal_node.path_cost, bound))
+        if self.on_solution is not None:
+            self.on_solution(get_sequence_of_actions(self.goal_node), self.goal_node.path_cost, bound)
@@ -0,0 +1,114 @@
+"""
+
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from board import get_state_error, read_board_lines
+from cache import get_solution_cache
+from problem import Problem
+from result import INVALID, SearchResult
+from search_algorithm import SearchAlgorithm
+
+
+# read the boards of a file, one board per line, see board.read_board_lines
+#   - yields (id, board) pairs, the id is the line number when the line has none
+def read_boards(path):
+    with open(path) as file:
+        yield from read_board_lines(file)
+
+
+# solve one board, the result is a dictionary that can be written as JSON
+#   - cache is False for no solution cache, True for a cache in memory, or the path of an SQLite cache file
+#   - an invalid board (bad length, a number out of range or repeated) or an unsolvable board gets a result with
+#     the reason in its message, and no search
+def solve_board(job_id, board, algorithm_choice, time_limit=None, node_limit=None, byte_budget=None, cache=False):
+    message = get_state_error(board)
+    if message is not None:
+        return dict(id=job_id, **SearchResult(INVALID, message=message).to_dict())
+
+    problem = Problem()
+    problem.set_puzzle(board, algorithm_choice)
+    init, goal, oper, algo = problem.get_initial_goal_operators_algorithm()
+
+    # an unsolvable board is rejected without a search
+    result = problem.check_solvable()
+    if result is None:
+        search = SearchAlgorithm(node_limit=node_limit, time_limit=time_limit, byte_budget=byte_budget)
+        if cache:
+            result = get_solution_cache(None if cache is True else cache).solve(init, goal, algo, search)
+        else:
+            result = search.solve(init, goal, algo)
+
+    return dict(id=job_id, **result.to_dict())
+
+
+# solve a chunk of boards in a worker process
+def solve_chunk(jobs, algorithm_choice, time_limit, node_limit, byte_budget, cache):
+    return [solve_board(job_id, board, algorithm_choice, time_limit, node_limit, byte_budget, cache)
+            for job_id, board in jobs]
+
+
+# solve many boards over a pool of processes, yields the result of each board as soon as its chunk is done
+#   - boards is an iterable of (id, board) pairs, results do not come back in the same order
+#   - boards are read as the results come back, at most max_pending chunks (two per worker by default) are in
+#     flight, so a long or endless stream is never read or queued all at once
+#   - time_limit (seconds), node_limit and byte_budget (memory of the stored nodes) apply to each board
+#   - each worker process has its own solution cache, see solve_board
+def solve_batch(boards, algorithm_choice='4', workers=None, chunk_size=16, time_limit=None, node_limit=None,
+                byte_budget=None, cache=False, max_pending=None):
+    max_pending = max_pending or 2 * (workers or os.cpu_count())
+    boards = iter(boards)
+    pending = set()
+    exhausted = False
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # fill the window of chunks in flight
+            while not exhausted and len(pending) < max_pending:
+                chunk = list(islice(boards, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(solve_chunk, chunk, algorithm_choice, time_limit, node_limit,
+                                            byte_budget, cache))
+
+            if not pending:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+# batch command line, python batch.py BOARDS_FILE [options], writes one JSON result per line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve a file of puzzles over all cores.")
+    parser.add_argument("boards", help="file with one board per line, numbers or JSON")
+    parser.add_argument("--algorithm", default='4', help="algorithm choice as in the interactive menu (default 4)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=16, help="number of boards sent to a worker at once")
+    parser.add_argument("--time-limit", type=float, help="seconds allowed for each board")
+    parser.add_argument("--node-limit", type=int, help="nodes expanded allowed for each board")
+    parser.add_argument("--memory-budget", type=float, help="megabytes of stored nodes allowed for each board")
+    parser.add_argument("--cache", nargs="?", const=True, default=False,
+                        help="reuse the solutions of symmetric boards, optionally kept in an SQLite file")
+    parser.add_argument("--output", help="file to write the results to (default standard output)")
+    args = parser.parse_args()
+
+    byte_budget = None if args.memory_budget is None else int(args.memory_budget * 2 ** 20)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for result in solve_batch(read_boards(args.boards), args.algorithm, args.workers, args.chunk_size,
+                                  args.time_limit, args.node_limit, byte_budget, args.cache):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
@@ -0,0 +1,298 @@
+"""
+
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from bidirectional import BidirectionalSearch
+from board import get_move_table
+from heuristic import get_default_goal_state, get_heuristic
+from ida_star import IterativeDeepeningSearch
+from oracle import MAX_LENGTH, load_oracle
+from result import NOT_FOUND, SOLVED
+from search_algorithm import SearchAlgorithm
+
+
+# the search engines that can be benchmarked
+ENGINES = ("astar", "ida", "bidirectional")
+
+# the optimal depths of the generated instances for each board size
+DEFAULT_DEPTHS = {
+    3: (8, 16, 24),
+    4: (10, 20, 30),
+    5: (10, 15, 20),
+}
+
+# the heuristic used to find the optimal depth of a 4x4 or larger instance
+DEPTH_ALGORITHM = '4'
+
+# how far below the target depth h(n) can be before the optimal depth is worth searching for
+DEPTH_SLACK = 6
+
+
+# get the optimal depth of a state, with the oracle for 3x3 boards and IDA* for larger boards
+def get_optimal_depth(state, goal_state):
+    if len(state) == MAX_LENGTH:
+        return load_oracle(goal_state, report=None).get_distance(state)
+
+    search = IterativeDeepeningSearch(report=None)
+    search.search(state, goal_state, DEPTH_ALGORITHM)
+    return search.depth
+
+
+# generate an instance with the given optimal depth by a random walk from the goal state
+#   - the walk never undoes its last move, every step changes the parity of the depth
+#   - once h(n) is close to the target depth, the optimal depth is checked, a walk that went past the target
+#     depth starts over from the goal state
+def generate_instance(size, depth, rng):
+    length = size * size
+    goal_state = list(get_default_goal_state(length))
+    heuristic = get_heuristic(DEPTH_ALGORITHM, length)
+    move_table = get_move_table(length)
+
+    while True:
+        state = list(goal_state)
+        blank_index = state.index(0)
+        reverse_move = None
+
+        for steps in range(1, 4 * depth + 1):
+            target_index, move = rng.choice([(target, move) for target, move in move_table[blank_index]
+                                             if move != reverse_move])
+            state[blank_index], state[target_index] = state[target_index], 0
+            blank_index = target_index
+            reverse_move = move ^ 1
+
+            if steps < depth or (steps - depth) % 2:
+                continue
+            if heuristic.get_cost(heuristic.evaluate(state)) < depth - DEPTH_SLACK:
+                continue
+
+            optimal_depth = get_optimal_depth(state, goal_state)
+            if optimal_depth == depth:
+                return state
+            if optimal_depth > depth:
+                break
+
+
+# generate the benchmark instances, the same seed always gives the same instances
+#   - the instances of a size and depth are all different boards
+#   - returns a list of dictionaries with the size, optimal depth, board and goal of each instance
+def generate_instances(sizes, count, seed, depths=None):
+    rng = random.Random(seed)
+    instances = []
+
+    for size in sizes:
+        for depth in (depths or DEFAULT_DEPTHS[size]):
+            boards = set()
+            for number in range(count):
+                board = generate_instance(size, depth, rng)
+                while tuple(board) in boards:
+                    board = generate_instance(size, depth, rng)
+                boards.add(tuple(board))
+
+                instances.append({
+                    "id": "{}x{}-d{}-{}".format(size, size, depth, number),
+                    "size": size,
+                    "depth": depth,
+                    "board": board,
+                    "goal": list(get_default_goal_state(size * size)),
+                })
+
+    return instances
+
+
+# run one search in the current process and send its measurements through the connection
+def run_case(engine, algorithm_choice, board, goal_state, connection):
+    try:
+        connection.send(search_case(engine, algorithm_choice, board, goal_state))
+    except Exception as error:
+        connection.send({"status": "error", "message": "{}: {}".format(type(error).__name__, error)})
+
+
+# run one search and measure it
+#   - the heuristic tables are loaded before the clock starts
+def search_case(engine, algorithm_choice, board, goal_state):
+    get_heuristic(algorithm_choice, len(board), goal_state)
+
+    start_time = time.perf_counter()
+    max_frontier_size = None
+
+    if engine == "astar":
+        search = SearchAlgorithm()
+        result = search.solve(board, goal_state, algorithm_choice)
+        status, depth, nodes = result.status, result.depth, result.num_nodes_expanded
+        max_frontier_size = search.max_frontier_size
+    elif engine == "ida":
+        search = IterativeDeepeningSearch(report=None)
+        actions = search.search(board, goal_state, algorithm_choice)
+        status = NOT_FOUND if actions is None else SOLVED
+        depth, nodes = search.depth, search.num_nodes_expanded
+    else:
+        search = BidirectionalSearch()
+        search.search(board, goal_state, algorithm_choice)
+        status, depth, nodes = search.status, search.depth, search.num_nodes_expanded
+        max_frontier_size = search.max_frontier_size
+
+    seconds = time.perf_counter() - start_time
+
+    return {
+        "status": status,
+        "solution_depth": depth,
+        "nodes_expanded": nodes,
+        "nodes_per_second": round(nodes / seconds) if seconds > 0 else None,
+        "max_frontier_size": max_frontier_size,
+        "seconds": round(seconds, 6),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+# run one search in a fresh process, so the peak memory is the search's own and a slow search can be stopped
+def measure(engine, algorithm_choice, board, goal_state, time_limit):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run_case, args=(engine, algorithm_choice, board, goal_state, sender))
+    process.start()
+    sender.close()
+
+    if not receiver.poll(time_limit):
+        process.terminate()
+        process.join()
+        return {"status": "timeout", "seconds": time_limit}
+
+    try:
+        measurement = receiver.recv()
+    except EOFError:
+        measurement = None
+    process.join()
+
+    # the process ended without sending anything, e.g. it ran out of memory
+    if measurement is None:
+        return {"status": "error", "message": "exit code {}".format(process.exitcode)}
+    return measurement
+
+
+# run every engine and algorithm choice on every instance, report is called with a line per run
+def run_benchmark(instances, engines, algorithm_choices, time_limit, report=print):
+    results = []
+
+    for instance in instances:
+        for engine in engines:
+            for algorithm_choice in algorithm_choices:
+                measurement = measure(engine, algorithm_choice, instance["board"], instance["goal"], time_limit)
+                results.append(dict(instance=instance["id"], engine=engine, algorithm=algorithm_choice,
+                                    **measurement))
+
+                if report is not None:
+                    report("{:<12} {:<14} {}  {:<10} nodes {:>10}  nodes/sec {:>10}  {:>9} s  peak {:>6.1f} MB".format(
+                        instance["id"], engine, algorithm_choice, measurement["status"],
+                        format_count(measurement.get("nodes_expanded")),
+                        format_count(measurement.get("nodes_per_second")),
+                        "{:.3f}".format(measurement["seconds"]) if "seconds" in measurement else "-",
+                        measurement.get("peak_rss", 0) / 2 ** 20))
+
+    return results
+
+
+# format a count with thousands separators, '-' when it is missing
+def format_count(count):
+    return "-" if count is None else "{:,}".format(count)
+
+
+# describe the machine and the code the benchmark ran on
+def get_environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+# compare two benchmark files, a run of the new file is flagged when
+#   - its status, solution depth or nodes expanded changed (the searches are deterministic)
+#   - its time or peak memory grew by more than the threshold (0.25 is 25%)
+#   - returns a list of (run, what, old value, new value)
+def compare(old, new, threshold):
+    old_runs = {(run["instance"], run["engine"], run["algorithm"]): run for run in old["results"]}
+    regressions = []
+
+    for run in new["results"]:
+        key = (run["instance"], run["engine"], run["algorithm"])
+        before = old_runs.get(key)
+        if before is None:
+            continue
+
+        for field in ("status", "solution_depth", "nodes_expanded"):
+            if before.get(field) != run.get(field):
+                regressions.append((key, field, before.get(field), run.get(field)))
+
+        for field in ("seconds", "peak_rss"):
+            if before.get(field) and run.get(field) and run[field] > before[field] * (1 + threshold):
+                regressions.append((key, field, before[field], run[field]))
+
+    return regressions
+
+
+# command line
+#   python benchmark.py run [--sizes 3 4] [--count 3] [--seed 1] [--output benchmark.json]
+#   python benchmark.py compare OLD.json NEW.json [--threshold 0.25]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the search engines on graded instances.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark and write the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[3, 4], choices=sorted(DEFAULT_DEPTHS),
+                            help="board sizes (default 3 4)")
+    run_parser.add_argument("--depths", type=int, nargs="+", help="optimal depths (default depends on the size)")
+    run_parser.add_argument("--count", type=int, default=3, help="instances of each size and depth (default 3)")
+    run_parser.add_argument("--seed", type=int, default=1, help="random seed of the instances (default 1)")
+    run_parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES,
+                            help="search engines (default all)")
+    run_parser.add_argument("--algorithms", nargs="+", default=['2', '3', '4'],
+                            help="algorithm choices as in the interactive menu (default 2 3 4)")
+    run_parser.add_argument("--time-limit", type=float, default=60, help="seconds allowed for each run (default 60)")
+    run_parser.add_argument("--output", default="benchmark.json", help="results file (default benchmark.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files and flag regressions")
+    compare_parser.add_argument("old", help="results file of the baseline")
+    compare_parser.add_argument("new", help="results file to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="allowed growth of time and memory (default 0.25)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        instances = generate_instances(args.sizes, args.count, args.seed, args.depths)
+        results = run_benchmark(instances, args.engines, args.algorithms, args.time_limit)
+
+        with open(args.output, "w") as file:
+            json.dump({"environment": get_environment(), "seed": args.seed, "instances": instances,
+                       "results": results}, file, indent=1)
+        print("{} runs written to {}".format(len(results), args.output))
+
+    else:
+        with open(args.old) as file:
+            old = json.load(file)
+        with open(args.new) as file:
+            new = json.load(file)
+
+        regressions = compare(old, new, args.threshold)
+        for (instance, engine, algorithm), field, before, after in regressions:
+            print("{:<12} {:<14} {}  {:<15} {} -> {}".format(instance, engine, algorithm, field, before, after))
+        print("{} regressions".format(len(regressions)))
+        sys.exit(1 if regressions else 0)
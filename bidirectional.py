@@ -0,0 +1,195 @@
+"""
+
+"""
+
+import heapq
+import time
+
+from board import MOVE_NAMES, get_move_table, get_tile_bits, is_solvable
+from frontier import create_frontier
+from heuristic import get_heuristic
+from node import Node, get_sequence_of_actions
+from result import CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE
+
+
+class SearchDirection:
+
+    # one half of the bidirectional search, a best-first search from the start towards the target
+    def __init__(self, start_state, target_state, algorithm_choice):
+        self.heuristic = get_heuristic(algorithm_choice, len(start_state), tuple(target_state))
+
+        root = Node()
+        root.set_data(list(start_state))
+        root.calculate_estimated_cost(algorithm_choice, 0, tuple(target_state))
+
+        self.frontier = create_frontier("heap")     # open nodes by MM priority, see get_priority
+        self.path_costs = []                        # heap of (g(n), order, key) of open nodes, for the lowest g(n)
+        self.explored_set = {}                      # state key -> expanded node
+        self.order = 0                              # insertion counter, keeps path_costs entries comparable
+        self.num_nodes_expanded = 0                 # the number of nodes expanded in this direction
+
+        self.push(root)
+
+    # the MM priority of a node, max(f(n), 2 g(n)), with the lower g(n) first on ties
+    #   - a node is only expanded before the midpoint of the solution, so the two searches meet in the middle
+    @staticmethod
+    def get_priority(node):
+        return max(node.estimated_cost, 2 * node.path_cost), node.path_cost
+
+    # add a node to the open nodes
+    def push(self, node):
+        key = node.get_key()
+        if self.frontier.push(key, self.get_priority(node), node):
+            heapq.heappush(self.path_costs, (node.path_cost, self.order, key))
+            self.order += 1
+
+    # get the open or expanded node of a state, None if the state was not reached in this direction
+    def get_node(self, key):
+        node = self.frontier.get(key)
+        return self.explored_set.get(key) if node is None else node
+
+    # get the lowest MM priority of the open nodes
+    def get_lowest_priority(self):
+        return self.frontier.peek_priority()[0]
+
+    # get the lowest g(n) of the open nodes, entries of nodes that left the frontier are dropped
+    def get_lowest_path_cost(self):
+        while self.path_costs:
+            path_cost, order, key = self.path_costs[0]
+            node = self.frontier.get(key)
+            if node is not None and node.path_cost == path_cost:
+                return path_cost
+            heapq.heappop(self.path_costs)
+        return float("inf")
+
+
+class BidirectionalSearch:
+
+    def __init__(self, time_limit=None, node_limit=None, cancel_event=None):
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.node_limit = node_limit    # stop after this many nodes are expanded, None for no limit
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of nodes expanded in both directions
+        self.depth = 0                  # the depth of the goal node
+        self.max_frontier_size = 0      # the most nodes the two frontiers held at once
+        self.forward = None             # the search from the initial state towards the goal state
+        self.backward = None            # the search from the goal state towards the initial state
+
+    # bidirectional A* with the MM meet-in-the-middle rule (Holte et al. 2016)
+    #   - each direction is a best-first search by max(f(n), 2 g(n)), with h(n) towards the other end
+    #   - the direction with the lower priority is expanded, when a child is known to the other direction
+    #     the two half-paths form a solution, the cheapest one is kept
+    #   - the search stops when no cheaper solution can exist, so the solution is optimal with an admissible h(n)
+    #   - the node limit is checked before each expansion, the time limit and cancel event every 1024 expansions
+    #   - returns the sequence of actions (e.g. ["move up", "move left"]), or None if there is no solution
+    def search(self, initial_state, goal_state, algorithm_choice):
+        self.num_nodes_expanded = 0
+        self.max_frontier_size = 0
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return None
+
+        # the initial state could already be the goal state
+        if list(initial_state) == list(goal_state):
+            self.status = SOLVED
+            self.depth = 0
+            return []
+
+        # a pattern database is built for one goal state, so the backward search, whose target is the initial state,
+        # uses the manhattan distance instead, both are admissible so the solution is still optimal
+        backward_choice = '4' if algorithm_choice == '5' else algorithm_choice
+
+        self.forward = SearchDirection(initial_state, goal_state, algorithm_choice)
+        self.backward = SearchDirection(goal_state, initial_state, backward_choice)
+
+        length = len(initial_state)
+        bits = get_tile_bits(length)
+        move_table = get_move_table(length)
+
+        # the cheapest solution found so far, its cost and the meeting nodes of the two directions
+        best_cost = float("inf")
+        meeting = None
+
+        while len(self.forward.frontier) and len(self.backward.frontier):
+            lowest_forward = self.forward.get_lowest_priority()
+            lowest_backward = self.backward.get_lowest_priority()
+
+            # lower bound on the cost of any solution not found yet, every step costs 1
+            bound = max(min(lowest_forward, lowest_backward),
+                        self.forward.get_lowest_path_cost() + self.backward.get_lowest_path_cost() + 1)
+            if best_cost <= bound:
+                break
+
+            if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+                self.status = NODE_LIMIT
+                return None
+            if (self.num_nodes_expanded & 1023) == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    self.status = TIMEOUT
+                    return None
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.status = CANCELLED
+                    return None
+
+            # expand the direction with the lower priority, forward on ties
+            if lowest_forward <= lowest_backward:
+                direction, other = self.forward, self.backward
+            else:
+                direction, other = self.backward, self.forward
+
+            parent = direction.frontier.pop()
+            direction.explored_set[parent.get_key()] = parent
+            direction.num_nodes_expanded += 1
+            self.num_nodes_expanded += 1
+            reverse_move = parent.move ^ 1
+
+            for target_index, move in move_table[parent.blank_index]:
+                if move == reverse_move:
+                    continue
+
+                child = parent.create_child(target_index, move, bits, direction.heuristic)
+                key = child.get_key()
+
+                # skip the child if its state was reached as cheaply in this direction
+                known = direction.get_node(key)
+                if known is not None and known.path_cost <= child.path_cost:
+                    continue
+                direction.explored_set.pop(key, None)
+                direction.push(child)
+
+                # the two searches meet, keep the cheapest solution
+                opposite = other.get_node(key)
+                if opposite is not None and child.path_cost + opposite.path_cost < best_cost:
+                    best_cost = child.path_cost + opposite.path_cost
+                    meeting = (child, opposite) if direction is self.forward else (opposite, child)
+
+            frontier_size = len(self.forward.frontier) + len(self.backward.frontier)
+            if frontier_size > self.max_frontier_size:
+                self.max_frontier_size = frontier_size
+
+        if meeting is None:
+            self.status = NOT_FOUND
+            return None
+
+        self.status = SOLVED
+        actions = self.join_paths(*meeting)
+        self.depth = len(actions)
+        return actions
+
+    # join the half-paths of the forward node and the backward node of the same state into one sequence of actions
+    @staticmethod
+    def join_paths(forward_node, backward_node):
+        # start -> meeting state, the moves of the forward nodes in reverse
+        actions = get_sequence_of_actions(forward_node)
+
+        # meeting state -> goal, undo the moves of the backward nodes on the way back to the goal state
+        node = backward_node
+        while node.get_parent() is not None:
+            actions.append("move " + MOVE_NAMES[node.move ^ 1])
+            node = node.get_parent()
+
+        return actions
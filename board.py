@@ -0,0 +1,206 @@
+"""
+
+"""
+
+from functools import lru_cache
+from math import isqrt
+
+# a state is packed into one integer, each tile takes a fixed number of bits
+#
+#   state [1, 2, 3, 4, 5, 6, 7, 8, 0] with 4 bits per tile
+#   index 0 is in the lowest bits:  0x087654321
+#
+# the tile at an index is (packed >> (index * bits)) & mask, and moving the blank square is two xor
+# operations, as the blank square (0) has no bits set
+
+
+# move codes of the blank square, a move and its inverse differ only in the lowest bit (inverse = move ^ 1)
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+MOVE_NAMES = ("up", "down", "left", "right")
+
+# the move of the start node, no move code is the inverse of it
+NO_MOVE = -1
+
+
+# get the number of bits used for each tile, 4 bits covers the 3x3 and 4x4 boards
+def get_tile_bits(length):
+    return max(4, (length - 1).bit_length())
+
+
+# pack a list of tiles into one integer
+def encode_state(state, bits=None):
+    if bits is None:
+        bits = get_tile_bits(len(state))
+
+    packed = 0
+    for index, tile in enumerate(state):
+        packed |= tile << (index * bits)
+    return packed
+
+
+# unpack an integer into a list of tiles
+def decode_state(packed, length, bits=None):
+    if bits is None:
+        bits = get_tile_bits(length)
+
+    mask = (1 << bits) - 1
+    state = []
+    for index in range(length):
+        state.append(packed & mask)
+        packed >>= bits
+    return state
+
+
+# get the tile at an index of the packed state
+def get_tile(packed, index, bits):
+    return (packed >> (index * bits)) & ((1 << bits) - 1)
+
+
+# move the blank square to the target index, the tile at the target index moves to the blank square index
+def move_blank(packed, blank_index, target_index, bits):
+    tile = (packed >> (target_index * bits)) & ((1 << bits) - 1)
+    return packed ^ (tile << (target_index * bits)) ^ (tile << (blank_index * bits))
+
+
+# swap the tiles at two indices of the packed state
+def swap_tiles(packed, index_one, index_two, bits):
+    mask = (1 << bits) - 1
+    tile_one = (packed >> (index_one * bits)) & mask
+    tile_two = (packed >> (index_two * bits)) & mask
+    difference = tile_one ^ tile_two
+    return packed ^ (difference << (index_one * bits)) ^ (difference << (index_two * bits))
+
+
+# build the move table for a board, built once for each board length
+#   - index i of the table is the blank square index, it holds a tuple of (target index, move code) pairs
+#   - the target index is where the blank square moves to, the tile there moves to the blank square index
+@lru_cache(maxsize=None)
+def get_move_table(length):
+    num_row_col = isqrt(length)
+    table = []
+
+    for blank_index in range(length):
+        row, col = divmod(blank_index, num_row_col)
+        moves = []
+
+        if row > 0:
+            moves.append((blank_index - num_row_col, UP))
+        if row < num_row_col - 1:
+            moves.append((blank_index + num_row_col, DOWN))
+        if col > 0:
+            moves.append((blank_index - 1, LEFT))
+        if col < num_row_col - 1:
+            moves.append((blank_index + 1, RIGHT))
+
+        table.append(tuple(moves))
+
+    return tuple(table)
+
+
+# check that a state is a square board that holds each tile 0 to length - 1 exactly once
+def is_valid_state(state):
+    length = len(state)
+    num_row_col = isqrt(length)
+    return length > 1 and num_row_col * num_row_col == length and sorted(state) == list(range(length))
+
+
+# get the reason a state is not valid (see is_valid_state), a message for the user, None if the state is valid
+def get_state_error(state):
+    length = len(state)
+    if length == 0:
+        return "The board is empty or is not a list of numbers."
+
+    num_row_col = isqrt(length)
+    if length == 1 or num_row_col * num_row_col != length:
+        return "The board has {} numbers, a square board of N rows holds N * N numbers.".format(length)
+
+    seen = set()
+    for tile in state:
+        if not 0 <= tile < length:
+            return "The board holds {}, the numbers must be from 0 to {}.".format(tile, length - 1)
+        if tile in seen:
+            return "The board holds {} more than once.".format(tile)
+        seen.add(tile)
+    return None
+
+
+# parse the text of a board, numbers separated by spaces or commas (e.g. "1 2 3 4 5 6 7 0 8") or a JSON list
+#   - returns the list of tiles, raises ValueError if the text is not a list of numbers, the board is not validated
+def parse_board(text):
+    text = text.strip()
+    if text.startswith("["):
+        import json
+        return [int(tile) for tile in json.loads(text)]
+    return [int(tile) for tile in text.replace(",", " ").split()]
+
+
+# read the boards of lines of text, one board per line, e.g. the lines of a file or of standard input
+#   - a line is a board (see parse_board), or a JSON object with a "board" list and an optional "id"
+#   - blank lines and lines starting with '#' are skipped, a line is parsed as soon as it is read
+#   - a line that cannot be parsed gives an empty board, which is not a valid state, so one bad line does not
+#     stop a stream
+#   - yields (id, board) pairs, the id is the line number when the line has none
+def read_board_lines(lines):
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        job_id = line_number
+        try:
+            if line.startswith("{"):
+                import json
+                data = json.loads(line)
+                job_id = data.get("id", line_number)
+                board = [int(tile) for tile in data["board"]]
+            else:
+                board = parse_board(line)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            board = []
+
+        yield job_id, board
+
+
+# count the inversions of a list of distinct integers, pairs (i, j) with i < j and list[i] > list[j], O(N log N)
+def count_inversions(values):
+    if len(values) < 2:
+        return 0
+
+    middle = len(values) // 2
+    left, right = values[:middle], values[middle:]
+    inversions = count_inversions(left) + count_inversions(right)
+
+    # merge the sorted halves back into values, every element of the left half that is still
+    # waiting when an element of the right half is taken forms an inversion with it
+    left.sort()
+    right.sort()
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            values[i + j] = left[i]
+            i += 1
+        else:
+            values[i + j] = right[j]
+            inversions += len(left) - i
+            j += 1
+    values[i + j:] = left[i:] + right[j:]
+
+    return inversions
+
+
+# check if the goal state can be reached from the initial state, by inversion parity
+#   - write the initial state as a permutation of the goal indices (where each tile belongs in the goal state)
+#   - every move swaps the blank square with a neighbour, it flips the parity of the permutation and moves the
+#     blank square one row or column, so the parity of the inversions always matches the parity of the
+#     blank square's row + column distance from its goal index
+#   - this holds for any NxN board and any goal state
+def is_solvable(initial_state, goal_state):
+    num_row_col = isqrt(len(goal_state))
+    goal_index = {tile: index for index, tile in enumerate(goal_state)}
+    permutation = [goal_index[tile] for tile in initial_state]
+
+    blank_row, blank_col = divmod(initial_state.index(0), num_row_col)
+    goal_row, goal_col = divmod(goal_index[0], num_row_col)
+    blank_distance = abs(blank_row - goal_row) + abs(blank_col - goal_col)
+
+    return count_inversions(permutation) % 2 == blank_distance % 2
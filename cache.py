@@ -0,0 +1,194 @@
+"""
+
+"""
+
+import sqlite3
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from math import isqrt
+
+from board import MOVE_NAMES, is_solvable
+from result import SOLVED, UNSOLVABLE, SearchResult
+from search_algorithm import SearchAlgorithm
+
+
+# the move code of each action, e.g. "move up" -> 0 (see board.py)
+MOVE_CODES = {"move " + name: move for move, name in enumerate(MOVE_NAMES)}
+
+# the change of (row, column) of the blank square for each move code, up, down, left, right
+MOVE_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# the 8 symmetries of a square board, each maps (row, col) to (row, col) on an NxN board, last = N - 1
+#   - identity, the 3 rotations, the 2 mirrors and the 2 transposes
+SYMMETRIES = (
+    lambda row, col, last: (row, col),
+    lambda row, col, last: (col, last - row),
+    lambda row, col, last: (last - row, last - col),
+    lambda row, col, last: (last - col, row),
+    lambda row, col, last: (row, last - col),
+    lambda row, col, last: (last - row, col),
+    lambda row, col, last: (col, row),
+    lambda row, col, last: (last - col, last - row),
+)
+
+
+# get the index maps of the symmetries of an NxN board
+#   - returns a tuple of (square map, inverse square map, move map) for each symmetry, the square map sends
+#     index i to the index of its image, the move map sends a move code to the move code of its image
+@lru_cache(maxsize=None)
+def get_symmetry_maps(length):
+    num_row_col = isqrt(length)
+    last = num_row_col - 1
+    maps = []
+
+    for symmetry in SYMMETRIES:
+        square_map = []
+        for index in range(length):
+            row, col = symmetry(*divmod(index, num_row_col), last)
+            square_map.append(row * num_row_col + col)
+
+        inverse_map = [0] * length
+        for index, image in enumerate(square_map):
+            inverse_map[image] = index
+
+        # the image of a step is the difference of the images of its two ends
+        origin_row, origin_col = symmetry(0, 0, last)
+        move_map = []
+        for row_step, col_step in MOVE_STEPS:
+            row, col = symmetry(row_step, col_step, last)
+            move_map.append(MOVE_STEPS.index((row - origin_row, col - origin_col)))
+
+        maps.append((tuple(square_map), tuple(inverse_map), tuple(move_map)))
+
+    return tuple(maps)
+
+
+# get the canonical key of a puzzle and the symmetry that gives it
+#   - only where each tile has to go matters, so the puzzle is the permutation relative[p] = goal index of the
+#     tile at index p and the goal index of the blank square, the same for every board and goal layout with the
+#     same relative permutation
+#   - a symmetry s of the board gives the permutation s o relative o s^-1, the lowest of the 8 is the key
+#   - returns (key, symmetry index), the key is a tuple of the board length, the goal index of the blank square
+#     and the permutation
+def get_canonical_key(initial_state, goal_state):
+    length = len(initial_state)
+    goal_index = [0] * length
+    for index, tile in enumerate(goal_state):
+        goal_index[tile] = index
+    relative = [goal_index[tile] for tile in initial_state]
+
+    best = None
+    for symmetry, (square_map, inverse_map, move_map) in enumerate(get_symmetry_maps(length)):
+        image = (square_map[goal_index[0]],) + tuple(square_map[relative[inverse_map[index]]]
+                                                     for index in range(length))
+        if best is None or image < best[0]:
+            best = (image, symmetry)
+
+    return (length,) + best[0], best[1]
+
+
+class SolutionCache:
+
+    # a cache of optimal solutions in front of the graph search
+    #   - symmetric puzzles share one entry, the moves are kept in the frame of the canonical key and mapped to
+    #     the frame of each puzzle
+    #   - the least recently used entries are evicted past max_size, and with a path every solution is also
+    #     kept in an SQLite file, so it outlives the process
+    def __init__(self, max_size=100000, path=None):
+        self.max_size = max_size        # the most entries kept in memory
+        self.entries = OrderedDict()    # canonical key -> move codes in the canonical frame, least recent first
+        self.hits = 0                   # the number of puzzles answered by the cache
+        self.misses = 0                 # the number of puzzles that had to be searched
+
+        self.database = None            # the SQLite connection, None for a cache in memory only
+        if path is not None:
+            self.database = sqlite3.connect(path)
+            self.database.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, moves TEXT)")
+            self.database.commit()
+
+    # get the cached solution of a puzzle, the sequence of actions (e.g. ["move up"]) or None if it is not cached
+    def get(self, initial_state, goal_state):
+        key, symmetry = get_canonical_key(initial_state, goal_state)
+
+        moves = self.entries.get(key)
+        if moves is not None:
+            self.entries.move_to_end(key)
+        elif self.database is not None:
+            row = self.database.execute("SELECT moves FROM solutions WHERE key = ?", (self.get_text(key),)).fetchone()
+            if row is not None:
+                moves = bytes(int(move) for move in row[0])
+                self.store(key, moves)
+
+        if moves is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        # the canonical frame is the image of the puzzle by the symmetry, map each move back with its inverse
+        move_map = get_symmetry_maps(len(initial_state))[symmetry][2]
+        return ["move " + MOVE_NAMES[move_map.index(move)] for move in moves]
+
+    # add the optimal solution of a puzzle
+    def put(self, initial_state, goal_state, actions):
+        key, symmetry = get_canonical_key(initial_state, goal_state)
+        move_map = get_symmetry_maps(len(initial_state))[symmetry][2]
+        moves = bytes(move_map[MOVE_CODES[action]] for action in actions)
+
+        self.store(key, moves)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                                  (self.get_text(key), "".join(str(move) for move in moves)))
+            self.database.commit()
+
+    # keep an entry in memory, the least recently used entry is evicted when the cache is full
+    def store(self, key, moves):
+        self.entries[key] = moves
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    # solve a puzzle with the cache in front of the graph search, only optimal solutions are added
+    #   - returns a search result, a cached solution has 0 nodes expanded
+    def solve(self, initial_state, goal_state, algorithm_choice, search=None):
+        start_time = time.perf_counter()
+        if not is_solvable(initial_state, goal_state):
+            return SearchResult(UNSOLVABLE)
+
+        actions = self.get(initial_state, goal_state)
+        if actions is not None:
+            return SearchResult(SOLVED, actions, 0, time.perf_counter() - start_time)
+
+        search = search or SearchAlgorithm()
+        result = search.solve(initial_state, goal_state, algorithm_choice)
+        if result.is_solved() and result.bound == 1:
+            self.put(initial_state, goal_state, result.actions)
+        return result
+
+    # get the hit and miss counters
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+        }
+
+    # close the SQLite file
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    # get the text of a key for the SQLite file
+    @staticmethod
+    def get_text(key):
+        return ",".join(str(item) for item in key)
+
+
+# get the solution cache of the process, one cache for each path (None for a cache in memory only)
+@lru_cache(maxsize=None)
+def get_solution_cache(path=None):
+    return SolutionCache(path=path)
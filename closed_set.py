@@ -0,0 +1,36 @@
+"""
+
+"""
+
+
+class ClosedSet:
+
+    def __init__(self):
+        self.best_path_cost = {}    # state key -> the lowest path cost g(n) the state was expanded with
+
+    # add an expanded state with its path cost, keeping the lowest path cost seen for the state
+    def add(self, key, path_cost):
+        best = self.best_path_cost.get(key)
+        if best is None or path_cost < best:
+            self.best_path_cost[key] = path_cost
+
+    # check if a path to the state with this path cost is worth keeping
+    #   - True if the state was never expanded, or was expanded through a more expensive path
+    def is_improvement(self, key, path_cost):
+        best = self.best_path_cost.get(key)
+        return best is None or path_cost < best
+
+    # remove the state so it can be expanded again (re-opened) through a cheaper path
+    #   - returns True if the state was in the explored set
+    def remove(self, key):
+        return self.best_path_cost.pop(key, None) is not None
+
+    # get the lowest path cost the state was expanded with, None if it was never expanded
+    def get_path_cost(self, key):
+        return self.best_path_cost.get(key)
+
+    def __contains__(self, key):
+        return key in self.best_path_cost
+
+    def __len__(self):
+        return len(self.best_path_cost)
@@ -0,0 +1,404 @@
+"""
+
+"""
+
+import argparse
+import heapq
+import os
+import shutil
+import tempfile
+import time
+
+from board import (MOVE_NAMES, decode_state, encode_state, get_move_table, get_tile, get_tile_bits, is_solvable,
+                   move_blank)
+from heuristic import get_heuristic
+from result import CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE, SearchResult
+
+
+# the number of states read or written with one call
+BLOCK_STATES = 65536
+
+# the most child states sorted in memory at once, each sorted run is written to its own file
+RUN_STATES = 1 << 20
+
+
+# get the number of bytes of a packed state in a layer file
+def get_record_width(length):
+    return (length * get_tile_bits(length) + 7) // 8
+
+
+# read the packed states of a layer file in order
+#   - the states are fixed-width big-endian integers, so the order of the bytes is the order of the integers
+def read_states(path, width, counter=None):
+    with open(path, "rb") as file:
+        while True:
+            block = file.read(width * BLOCK_STATES)
+            if not block:
+                return
+            if counter is not None:
+                counter[0] += len(block)
+            for start in range(0, len(block), width):
+                yield int.from_bytes(block[start:start + width], "big")
+
+
+# write packed states to a file in the order given, returns the number of states written
+def write_states(path, states, width, counter=None):
+    count = 0
+    buffer = bytearray()
+    with open(path, "wb") as file:
+        for state in states:
+            buffer += state.to_bytes(width, "big")
+            count += 1
+            if len(buffer) >= width * BLOCK_STATES:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+
+    if counter is not None:
+        counter[0] += count * width
+    return count
+
+
+# merge sorted streams of states into one sorted stream, each state once
+def merge_unique(streams):
+    last = None
+    for state in heapq.merge(*streams):
+        if state != last:
+            yield state
+            last = state
+
+
+# drop the states of a sorted stream that are also in a sorted stream of states to remove
+def subtract(states, removed):
+    removed = iter(removed)
+    current = next(removed, None)
+    for state in states:
+        while current is not None and current < state:
+            current = next(removed, None)
+        if current != state:
+            yield state
+
+
+# check if a layer file holds a state, a binary search over the fixed-width records
+def contains_state(path, state, width):
+    with open(path, "rb") as file:
+        low, high = 0, os.path.getsize(path) // width
+        while low < high:
+            middle = (low + high) // 2
+            file.seek(middle * width)
+            found = int.from_bytes(file.read(width), "big")
+            if found == state:
+                return True
+            if found < state:
+                low = middle + 1
+            else:
+                high = middle
+    return False
+
+
+# get the index of the blank square of a packed state
+def find_blank(state, length, bits):
+    mask = (1 << bits) - 1
+    for index in range(length):
+        if (state >> (index * bits)) & mask == 0:
+            return index
+    raise ValueError("the state has no blank square")
+
+
+class ExternalSearch:
+
+    # breadth-first search with its layers on disk
+    #   - directory holds the layer files, a temporary directory that is removed after the search when None
+    #   - run_states is the most child states sorted in memory at once, it bounds the memory of the search
+    #   - on_layer is called with the report of every layer (a dictionary, see expand_layer), None to print it
+    #   - upper_bound turns the search into a breadth-first heuristic search (Zhou and Hansen 2006), a child at
+    #     depth d with d + h(n) over the bound cannot be on a solution within the bound and is not written, see solve
+    #   - vectorized evaluates the heuristic of a whole run of children in one NumPy call, see vector_heuristic.py,
+    #     otherwise each child is updated from its parent, only sums of tile costs and linear conflict can be
+    #   - the node limit, time limit and cancel event are checked between layers
+    def __init__(self, directory=None, run_states=RUN_STATES, node_limit=None, on_layer=None, verbose=False,
+                 upper_bound=None, vectorized=False, time_limit=None, cancel_event=None):
+        self.directory = directory      # the directory of the layer files, None for a temporary directory
+        self.run_states = run_states    # the most child states sorted in memory at once
+        self.node_limit = node_limit    # stop after this many states are expanded, None for no limit
+        self.on_layer = on_layer        # called with the report of every layer, None for none
+        self.verbose = verbose          # print the report of every layer
+        self.upper_bound = upper_bound  # the most moves of a solution, None to not prune
+        self.vectorized = vectorized    # evaluate the heuristic of each run of children with NumPy
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of states expanded
+        self.num_pruned = 0             # the number of children pruned by the upper bound
+        self.depth = 0                  # the depth of the goal state
+        self.layers = []                # the report of every layer, in order of depth
+
+        self.length = 0                 # the number of squares on the board
+        self.bits = 4                   # the number of bits used for each tile of a packed state
+        self.width = 1                  # the number of bytes of a state in a layer file
+        self.work_directory = None      # the directory the layer files of the current search are in
+        self.heuristic = None           # the heuristic of the pruning, towards the goal state of the search
+
+    # the breadth-first search, one layer of states at a time
+    #   - layer d is a file of the states at depth d, sorted and each state once
+    #   - the children of layer d are sorted in runs of run_states, and the runs are merged into layer d + 1,
+    #     a state in layer d or d - 1 is dropped, with unit step costs every child is in layer d - 1, d or d + 1
+    #   - only one run and one block of each file are in memory, the layers can be far larger than memory
+    #   - goal_state None enumerates every state that can be reached, a max depth stops after that layer
+    #   - returns the depth of the goal state, or None if it was not found
+    def search(self, initial_state, goal_state=None, max_depth=None):
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.length = len(initial_state)
+        self.bits = get_tile_bits(self.length)
+        self.width = get_record_width(self.length)
+        self.status = None
+        self.num_nodes_expanded = 0
+        self.num_pruned = 0
+        self.depth = 0
+        self.layers = []
+
+        goal_key = None if goal_state is None else encode_state(goal_state, self.bits)
+        root_key = encode_state(initial_state, self.bits)
+
+        write_states(self.get_layer_path(0), [root_key], self.width)
+        self.report_layer(0, 1, 0.0, 0, self.width, 0)
+        if root_key == goal_key:
+            return 0
+
+        depth = 0
+        while max_depth is None or depth < max_depth:
+            if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+                self.status = NODE_LIMIT
+                return None
+            if deadline is not None and time.perf_counter() > deadline:
+                self.status = TIMEOUT
+                return None
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                self.status = CANCELLED
+                return None
+
+            count, found = self.expand_layer(depth, goal_key)
+            depth += 1
+
+            # keep the last two layers for the duplicate check, and every layer to trace a solution back
+            if goal_key is None and depth >= 3:
+                os.remove(self.get_layer_path(depth - 3))
+
+            if found:
+                return depth
+            if count == 0:
+                break
+
+        self.status = NOT_FOUND
+        return None
+
+    # expand layer d into layer d + 1
+    #   - returns (the number of states in layer d + 1, True if the goal state is one of them)
+    def expand_layer(self, depth, goal_key):
+        start_time = time.perf_counter()
+        read_bytes = [0]
+        written_bytes = [0]
+        move_table = get_move_table(self.length)
+        num_pruned = self.num_pruned
+
+        # the scalar heuristic is evaluated once for each state and updated for each child
+        heuristic = None if self.vectorized else self.heuristic
+        max_cost = None if self.heuristic is None else self.upper_bound - depth - 1
+
+        # sort the children in runs, each run is written to its own file
+        run_paths = []
+        run = []
+        for state in read_states(self.get_layer_path(depth), self.width, read_bytes):
+            self.num_nodes_expanded += 1
+            blank_index = find_blank(state, self.length, self.bits)
+            if heuristic is None:
+                for target_index, move in move_table[blank_index]:
+                    run.append(move_blank(state, blank_index, target_index, self.bits))
+            else:
+                raw = heuristic.evaluate(decode_state(state, self.length, self.bits))
+                for target_index, move in move_table[blank_index]:
+                    child = move_blank(state, blank_index, target_index, self.bits)
+                    tile = get_tile(state, target_index, self.bits)
+                    if heuristic.get_cost(heuristic.update(raw, tile, target_index, blank_index, child)) > max_cost:
+                        self.num_pruned += 1
+                    else:
+                        run.append(child)
+
+            if len(run) >= self.run_states:
+                run_paths.append(self.write_run(run, depth, len(run_paths), written_bytes))
+                run = []
+        if run or not run_paths:
+            run_paths.append(self.write_run(run, depth, len(run_paths), written_bytes))
+
+        # merge the runs, dropping the states of the last two layers, and watch for the goal state
+        runs = [read_states(path, self.width, read_bytes) for path in run_paths]
+        previous = [read_states(self.get_layer_path(layer), self.width, read_bytes)
+                    for layer in (depth - 1, depth) if layer >= 0]
+        found = [False]
+
+        def check_goal(states):
+            for state in states:
+                if state == goal_key:
+                    found[0] = True
+                yield state
+
+        count = write_states(self.get_layer_path(depth + 1),
+                             check_goal(subtract(merge_unique(runs), merge_unique(previous))),
+                             self.width, written_bytes)
+
+        for path in run_paths:
+            os.remove(path)
+
+        self.report_layer(depth + 1, count, time.perf_counter() - start_time, read_bytes[0], written_bytes[0],
+                          self.num_pruned - num_pruned)
+        return count, found[0]
+
+    # sort a run of child states and write it to a file, each state once, returns the path of the file
+    #   - with the vectorized heuristic, the children over the upper bound are pruned here, the whole run at once
+    def write_run(self, run, depth, number, written_bytes):
+        path = os.path.join(self.work_directory, "run-{}-{}.bin".format(depth + 1, number))
+        if self.vectorized and self.heuristic is not None and run:
+            run = self.prune_run(run, self.upper_bound - depth - 1)
+        run.sort()
+        write_states(path, merge_unique([run]), self.width, written_bytes)
+        return path
+
+    # drop the children of a run whose heuristic cost is over max_cost, returns the children that are kept
+    def prune_run(self, run, max_cost):
+        from vector_heuristic import stack_states
+
+        costs = self.heuristic.get_costs(self.heuristic.evaluate(stack_states(run, self.length)))
+        kept = [state for state, keep in zip(run, (costs <= max_cost).tolist()) if keep]
+        self.num_pruned += len(run) - len(kept)
+        return kept
+
+    # keep the report of a layer, it is sent to on_layer and printed when verbose
+    def report_layer(self, depth, count, seconds, read_bytes, written_bytes, pruned):
+        report = {
+            "depth": depth,
+            "states": count,
+            "pruned": pruned,
+            "seconds": round(seconds, 6),
+            "read_bytes": read_bytes,
+            "written_bytes": written_bytes,
+            "megabytes_per_second": round((read_bytes + written_bytes) / 2 ** 20 / seconds, 1) if seconds > 0 else 0.0,
+        }
+        self.layers.append(report)
+
+        if self.on_layer is not None:
+            self.on_layer(report)
+        if self.verbose:
+            print("depth {:>3}  {:>13,} states  {:>13,} pruned  {:>8.3f} s  read {:>9.1f} MB  written {:>9.1f} MB  "
+                  "{:>7.1f} MB/s".format(depth, count, pruned, seconds, read_bytes / 2 ** 20, written_bytes / 2 ** 20,
+                                         report["megabytes_per_second"]))
+
+    # trace the solution back from the goal state, through the layer files
+    #   - the parent of a state in layer d is the neighbour of the state that is in layer d - 1
+    #   - returns the sequence of actions (e.g. ["move up", "move left"])
+    def trace_path(self, goal_key, depth):
+        move_table = get_move_table(self.length)
+        moves = []
+        state = goal_key
+
+        for layer in range(depth - 1, -1, -1):
+            blank_index = find_blank(state, self.length, self.bits)
+            for target_index, move in move_table[blank_index]:
+                parent = move_blank(state, blank_index, target_index, self.bits)
+                if contains_state(self.get_layer_path(layer), parent, self.width):
+                    # the blank square moved from the target index back to the blank index, the opposite move
+                    moves.append(move ^ 1)
+                    state = parent
+                    break
+
+        moves.reverse()
+        return ["move " + MOVE_NAMES[move] for move in moves]
+
+    # get the path of the file of a layer
+    def get_layer_path(self, depth):
+        return os.path.join(self.work_directory, "layer-{}.bin".format(depth))
+
+    # run the search in the layer directory, a temporary one is removed afterwards
+    def run(self, function, *args):
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.work_directory = self.directory
+            return function(*args)
+
+        self.work_directory = tempfile.mkdtemp(prefix="external-bfs-")
+        try:
+            return function(*args)
+        finally:
+            shutil.rmtree(self.work_directory, ignore_errors=True)
+
+    # enumerate every state that can be reached from a state, returns the number of states of each depth
+    def enumerate_states(self, initial_state, max_depth=None):
+        self.heuristic = None
+        self.run(self.search, initial_state, None, max_depth)
+        return [report["states"] for report in self.layers]
+
+    # solve a puzzle with the breadth-first search and return a search result
+    #   - the search is uniform cost with unit step costs, the heuristic of the algorithm choice is only used to
+    #     prune with the upper bound, the solution is still optimal when one exists within the bound
+    #   - a pruned state is never reached at a lower depth later, so the last two layers still catch every duplicate
+    def solve(self, initial_state, goal_state, algorithm_choice='1'):
+        start_time = time.perf_counter()
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return SearchResult(UNSOLVABLE)
+
+        self.heuristic = None
+        if self.upper_bound is not None:
+            if self.vectorized:
+                from vector_heuristic import get_vector_heuristic
+                self.heuristic = get_vector_heuristic(algorithm_choice, len(goal_state), tuple(goal_state))
+            else:
+                self.heuristic = get_heuristic(algorithm_choice, len(goal_state), goal_state)
+
+        def search_and_trace():
+            depth = self.search(initial_state, goal_state)
+            if depth is None:
+                return None
+            self.status = SOLVED
+            self.depth = depth
+            return self.trace_path(encode_state(goal_state, self.bits), depth)
+
+        actions = self.run(search_and_trace)
+        return SearchResult(self.status, actions, self.num_nodes_expanded, time.perf_counter() - start_time)
+
+
+# command line, python external_bfs.py [--size 3] [--board BOARD] [--max-depth D] [--directory DIR]
+#   - enumerates the states that can be reached from the goal state (or from BOARD) layer by layer, or solves
+#     BOARD with --solve, and prints the size and the I/O throughput of every layer
+#   - --solve --bound B prunes with the heuristic of --algorithm, --vectorized evaluates it with NumPy
+if __name__ == "__main__":
+    from heuristic import get_default_goal_state
+
+    parser = argparse.ArgumentParser(description="Breadth-first search with its layers on disk.")
+    parser.add_argument("--size", type=int, default=3, help="number of rows and columns (default 3)")
+    parser.add_argument("--board", help="tiles in row order, 0 for the blank square, the goal state by default")
+    parser.add_argument("--solve", action="store_true", help="solve BOARD instead of enumerating its states")
+    parser.add_argument("--max-depth", type=int, help="stop after this layer")
+    parser.add_argument("--directory", help="keep the layer files in this directory (default: a temporary one)")
+    parser.add_argument("--run-states", type=int, default=RUN_STATES,
+                        help="most child states sorted in memory at once (default {})".format(RUN_STATES))
+    parser.add_argument("--bound", type=int, help="most moves of a solution, prunes with the heuristic when solving")
+    parser.add_argument("--algorithm", default='4', help="algorithm choice of the pruning heuristic (default 4)")
+    parser.add_argument("--vectorized", action="store_true", help="evaluate the pruning heuristic with NumPy")
+    args = parser.parse_args()
+
+    length = args.size * args.size
+    goal = get_default_goal_state(length)
+    board = goal if args.board is None else [int(tile) for tile in args.board.replace(",", " ").split()]
+    search = ExternalSearch(args.directory, args.run_states, verbose=True, upper_bound=args.bound,
+                            vectorized=args.vectorized)
+
+    if args.solve:
+        result = search.solve(board, get_default_goal_state(len(board)), args.algorithm)
+        print("\n{}, {} moves, {:,} states expanded, {:.3f} s".format(result.status, result.depth,
+                                                                       result.num_nodes_expanded, result.seconds))
+        if result.is_solved():
+            print("\n".join(result.actions))
+    else:
+        sizes = search.enumerate_states(board, args.max_depth)
+        print("\n{:,} states in {} layers".format(sum(sizes), len(sizes)))
@@ -0,0 +1,188 @@
+"""
+
+"""
+
+import heapq
+from collections import deque
+
+
+# placeholder stored in an entry that was replaced by a cheaper one (lazy deletion)
+REMOVED = object()
+
+
+class HeapFrontier:
+
+    def __init__(self):
+        self.heap = []              # binary heap of [priority, order, key, item] entries
+        self.index = {}             # state key -> live entry, used for membership and decrease-key
+        self.counter = 0            # insertion counter, ties are broken first-in first-out
+        self.size = 0               # the number of live entries
+
+    # add an item to the frontier, or lower the priority of the item already stored under the same key
+    # returns False when the key is already in the frontier with a priority that is as good or better
+    def push(self, key, priority, item):
+        entry = self.index.get(key)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+
+            # decrease-key, the old entry stays in the heap but is skipped when it reaches the top
+            entry[3] = REMOVED
+            self.size -= 1
+
+        entry = [priority, self.counter, key, item]
+        self.counter += 1
+        self.index[key] = entry
+        heapq.heappush(self.heap, entry)
+        self.size += 1
+        return True
+
+    # remove and return the item with the lowest priority
+    def pop(self):
+        while self.heap:
+            priority, order, key, item = heapq.heappop(self.heap)
+            if item is not REMOVED:
+                del self.index[key]
+                self.size -= 1
+                return item
+        raise IndexError("pop from an empty frontier")
+
+    # remove the item stored under the key, if there is one
+    def remove(self, key):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            entry[3] = REMOVED
+            self.size -= 1
+
+    # get the lowest priority in the frontier
+    def peek_priority(self):
+        while self.heap and self.heap[0][3] is REMOVED:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            raise IndexError("peek at an empty frontier")
+        return self.heap[0][0]
+
+    # get the priority stored under the key, None if the key is not in the frontier
+    def get_priority(self, key):
+        entry = self.index.get(key)
+        return None if entry is None else entry[0]
+
+    # get the item stored under the key, None if the key is not in the frontier
+    def get(self, key):
+        entry = self.index.get(key)
+        return None if entry is None else entry[3]
+
+    # iterate over the items in the frontier, in no particular order
+    def nodes(self):
+        return (entry[3] for entry in self.index.values())
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return self.size
+
+
+class BucketFrontier:
+
+    # a bucket queue, only for integer priorities (e.g. f(n) with unit step costs and integer heuristics)
+    def __init__(self):
+        self.buckets = {}           # priority -> deque of [priority, order, key, item] entries
+        self.index = {}             # state key -> live entry, used for membership and decrease-key
+        self.counter = 0            # insertion counter, ties are broken first-in first-out
+        self.size = 0               # the number of live entries
+        self.lowest = None          # no live entry has a priority below this bucket
+
+    # add an item to the frontier, or lower the priority of the item already stored under the same key
+    # returns False when the key is already in the frontier with a priority that is as good or better
+    def push(self, key, priority, item):
+        entry = self.index.get(key)
+        if entry is not None:
+            if entry[0] <= priority:
+                return False
+
+            # decrease-key, the old entry stays in its bucket but is skipped when it is reached
+            entry[3] = REMOVED
+            self.size -= 1
+
+        entry = [priority, self.counter, key, item]
+        self.counter += 1
+        self.index[key] = entry
+
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = deque()
+        bucket.append(entry)
+
+        if self.lowest is None or priority < self.lowest:
+            self.lowest = priority
+        self.size += 1
+        return True
+
+    # remove and return the item with the lowest priority
+    def pop(self):
+        bucket = self.find_lowest_bucket()
+        priority, order, key, item = bucket.popleft()
+        del self.index[key]
+        self.size -= 1
+        return item
+
+    # remove the item stored under the key, if there is one
+    def remove(self, key):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            entry[3] = REMOVED
+            self.size -= 1
+
+    # get the lowest priority in the frontier
+    def peek_priority(self):
+        return self.find_lowest_bucket()[0][0]
+
+    # move the lowest pointer up to the first bucket that holds a live entry, dropping removed entries on the way
+    def find_lowest_bucket(self):
+        if self.size == 0:
+            raise IndexError("pop from an empty frontier")
+
+        while True:
+            bucket = self.buckets.get(self.lowest)
+            if bucket is not None:
+                while bucket and bucket[0][3] is REMOVED:
+                    bucket.popleft()
+                if bucket:
+                    return bucket
+                del self.buckets[self.lowest]
+            self.lowest += 1
+
+    # get the priority stored under the key, None if the key is not in the frontier
+    def get_priority(self, key):
+        entry = self.index.get(key)
+        return None if entry is None else entry[0]
+
+    # get the item stored under the key, None if the key is not in the frontier
+    def get(self, key):
+        entry = self.index.get(key)
+        return None if entry is None else entry[3]
+
+    # iterate over the items in the frontier, in no particular order
+    def nodes(self):
+        return (entry[3] for entry in self.index.values())
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return self.size
+
+
+# the available frontier implementations
+FRONTIERS = {
+    "heap": HeapFrontier,
+    "bucket": BucketFrontier,
+}
+
+
+# create an empty frontier of the given type, 'heap' or 'bucket'
+def create_frontier(frontier_type="heap"):
+    if frontier_type not in FRONTIERS:
+        raise ValueError("unknown frontier type '{}', expected one of {}".format(frontier_type, sorted(FRONTIERS)))
+    return FRONTIERS[frontier_type]()
@@ -0,0 +1,296 @@
+"""
+
+"""
+
+import argparse
+import heapq
+import multiprocessing
+import os
+import queue
+import time
+
+from board import MOVE_NAMES, encode_state, get_move_table, get_tile, get_tile_bits, is_solvable, move_blank
+from heuristic import get_heuristic
+from result import CANCELLED, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE, SearchResult
+
+
+# the number of nodes sent to a worker in one message
+BATCH_SIZE = 64
+
+# a worker sends its batches after this many expansions, even when they are not full
+FLUSH_INTERVAL = 256
+
+# seconds a worker with nothing to do waits for a message
+IDLE_WAIT = 0.005
+
+# multiplier that spreads the packed states over the workers (the 64-bit golden ratio)
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+# get the worker that owns a state
+def get_owner(key, num_workers):
+    return ((key * HASH_MULTIPLIER) >> 32) % num_workers
+
+
+class SharedState:
+
+    # the state shared by the coordinator and the workers, every change is made under the lock
+    #   - outstanding counts the batches that were sent and not yet received
+    #   - a worker is idle when it has no node that could lead to a cheaper solution and nothing left to send
+    #   - the search is over when every worker is idle and no batch is outstanding, both are read under the lock
+    #     and a batch is counted as received at the moment its worker stops being idle, so nothing is missed
+    def __init__(self, context, num_workers):
+        self.lock = context.Lock()
+        self.outstanding = context.Value("q", 0, lock=False)
+        self.idle = context.Array("b", [0] * num_workers, lock=False)
+        self.best_cost = context.Value("d", float("inf"), lock=False)   # the cost of the best solution found
+
+    # check if every worker is idle with no batch outstanding
+    def is_finished(self):
+        with self.lock:
+            return self.outstanding.value == 0 and all(self.idle)
+
+
+# the search of one worker, it owns the states that hash to it
+#   - open nodes are (f(n), -g(n), key, blank index, raw heuristic value), the deepest first on ties
+#   - path_costs keeps the lowest g(n) of every state that reached the worker, parents its parent and move
+def run_worker(number, num_workers, inboxes, results, shared, goal_state, algorithm_choice):
+    length = len(goal_state)
+    heuristic = get_heuristic(algorithm_choice, length, goal_state)
+    move_table = get_move_table(length)
+    bits = get_tile_bits(length)
+    goal_key = encode_state(goal_state, bits)
+
+    open_nodes = []
+    path_costs = {}
+    parents = {}
+    expanded = set()
+    outboxes = [[] for _ in range(num_workers)]
+    inbox = inboxes[number]
+    num_nodes_expanded = 0
+
+    # send the full (or every, when flush_all) outgoing batch to its owner
+    def flush(flush_all):
+        for owner, batch in enumerate(outboxes):
+            if batch and (flush_all or len(batch) >= BATCH_SIZE):
+                with shared.lock:
+                    shared.outstanding.value += 1
+                inboxes[owner].put(("nodes", batch))
+                outboxes[owner] = []
+
+    # add a node that this worker owns, unless the state was reached as cheaply before
+    def add_node(key, blank_index, path_cost, raw, parent_key, move):
+        if path_costs.get(key, path_cost + 1) <= path_cost:
+            return
+        path_costs[key] = path_cost
+        parents[key] = (parent_key, move)
+        expanded.discard(key)
+        heapq.heappush(open_nodes, (path_cost + heuristic.get_cost(raw), -path_cost, key, blank_index, raw))
+
+    while True:
+        # the messages first, a worker that is waiting for work blocks for a moment
+        while True:
+            try:
+                message = inbox.get(block=shared.idle[number] == 1, timeout=IDLE_WAIT)
+            except queue.Empty:
+                break
+
+            if message[0] == "nodes":
+                with shared.lock:
+                    shared.idle[number] = 0
+                    shared.outstanding.value -= 1
+                for node in message[1]:
+                    add_node(*node)
+            elif message[0] == "trace":
+                results.put(("trace", message[1], parents.get(message[1])))
+            elif message[0] == "stop":
+                results.put(("stats", number, num_nodes_expanded))
+                return
+
+        # drop the stale entries and the nodes that cannot lead to a cheaper solution
+        best_cost = shared.best_cost.value
+        while open_nodes and (open_nodes[0][0] >= best_cost or -open_nodes[0][1] > path_costs[open_nodes[0][2]]
+                              or open_nodes[0][2] in expanded):
+            heapq.heappop(open_nodes)
+
+        if not open_nodes:
+            flush(True)
+            with shared.lock:
+                shared.idle[number] = 1
+            continue
+
+        estimated_cost, path_cost, key, blank_index, raw = heapq.heappop(open_nodes)
+        path_cost = -path_cost
+        expanded.add(key)
+
+        if key == goal_key:
+            with shared.lock:
+                if path_cost < shared.best_cost.value:
+                    shared.best_cost.value = path_cost
+            continue
+
+        num_nodes_expanded += 1
+        reverse_move = parents[key][1] ^ 1 if parents[key][0] is not None else None
+
+        for target_index, move in move_table[blank_index]:
+            if move == reverse_move:
+                continue
+
+            tile = get_tile(key, target_index, bits)
+            child = move_blank(key, blank_index, target_index, bits)
+            child_raw = heuristic.update(raw, tile, target_index, blank_index, child)
+            if path_cost + 1 + heuristic.get_cost(child_raw) >= best_cost:
+                continue
+
+            owner = get_owner(child, num_workers)
+            node = (child, target_index, path_cost + 1, child_raw, key, move)
+            if owner == number:
+                add_node(*node)
+            else:
+                outboxes[owner].append(node)
+
+        flush(num_nodes_expanded % FLUSH_INTERVAL == 0)
+
+
+class ParallelSearch:
+
+    # the time limit and the cancel event are checked by the coordinator while it waits for the workers
+    def __init__(self, num_workers=None, time_limit=None, cancel_event=None):
+        self.num_workers = num_workers or os.cpu_count()  # the number of worker processes
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of nodes expanded by all workers
+        self.worker_nodes_expanded = []  # the number of nodes expanded by each worker
+        self.depth = 0                  # the depth of the goal node
+
+    # hash distributed A* (HDA*, Kishimoto, Fukunaga and Botea 2009)
+    #   - every state is owned by one worker process, picked by a hash of the packed state, the owner keeps its
+    #     open nodes and its best path costs, a generated child is sent to its owner in batches
+    #   - a worker that reaches the goal state shares the cost, every node with f(n) at or over it is pruned
+    #   - the search is over when every worker is idle and no batch is in flight, see SharedState, the best
+    #     solution is then optimal with an admissible heuristic
+    #   - the path is traced back by the coordinator, asking the owner of each state for its parent
+    #   - returns the sequence of actions (e.g. ["move up", "move left"]), or None if there is no solution
+    def search(self, initial_state, goal_state, algorithm_choice):
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.num_nodes_expanded = 0
+        self.worker_nodes_expanded = []
+
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return None
+
+        length = len(goal_state)
+        bits = get_tile_bits(length)
+        goal_key = encode_state(goal_state, bits)
+        root_key = encode_state(initial_state, bits)
+        root_raw = get_heuristic(algorithm_choice, length, goal_state).evaluate(list(initial_state))
+
+        context = multiprocessing.get_context()
+        shared = SharedState(context, self.num_workers)
+        inboxes = [context.Queue() for _ in range(self.num_workers)]
+        results = context.Queue()
+
+        workers = [context.Process(target=run_worker, args=(number, self.num_workers, inboxes, results, shared,
+                                                             tuple(goal_state), algorithm_choice), daemon=True)
+                   for number in range(self.num_workers)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            # the root is sent to its owner like any other node
+            with shared.lock:
+                shared.outstanding.value += 1
+            inboxes[get_owner(root_key, self.num_workers)].put(
+                ("nodes", [(root_key, list(initial_state).index(0), 0, root_raw, None, None)]))
+
+            stop_status = None
+            while not shared.is_finished():
+                if deadline is not None and time.perf_counter() > deadline:
+                    stop_status = TIMEOUT
+                    break
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    stop_status = CANCELLED
+                    break
+                time.sleep(IDLE_WAIT)
+
+            actions = None
+            if stop_status is None and shared.best_cost.value < float("inf"):
+                actions = self.trace_path(goal_key, inboxes, results)
+        finally:
+            for inbox in inboxes:
+                inbox.put(("stop",))
+            self.collect_stats(results)
+            for worker in workers:
+                worker.join()
+
+        if actions is None:
+            self.status = stop_status or NOT_FOUND
+            return None
+
+        self.status = SOLVED
+        self.depth = len(actions)
+        return actions
+
+    # trace the path from the goal state back to the initial state, one question to the owner of each state
+    def trace_path(self, goal_key, inboxes, results):
+        moves = []
+        key = goal_key
+        while True:
+            inboxes[get_owner(key, self.num_workers)].put(("trace", key))
+            kind, traced_key, (parent_key, move) = results.get()
+            if parent_key is None:
+                break
+            moves.append(move)
+            key = parent_key
+
+        moves.reverse()
+        return ["move " + MOVE_NAMES[move] for move in moves]
+
+    # collect the number of nodes expanded by each worker after they stop
+    def collect_stats(self, results):
+        self.worker_nodes_expanded = [0] * self.num_workers
+        for _ in range(self.num_workers):
+            kind, number, num_nodes_expanded = results.get()
+            self.worker_nodes_expanded[number] = num_nodes_expanded
+        self.num_nodes_expanded = sum(self.worker_nodes_expanded)
+
+    # run the search and return a search result
+    def solve(self, initial_state, goal_state, algorithm_choice):
+        start_time = time.perf_counter()
+        actions = self.search(initial_state, goal_state, algorithm_choice)
+        return SearchResult(self.status, actions, self.num_nodes_expanded, time.perf_counter() - start_time)
+
+    # output the sequence of actions to get from the initial state to the goal state, as the graph search does
+    @staticmethod
+    def output_sequence_of_actions(actions):
+        print("\n\nSEQUENCE OF ACTIONS\n-------------------------------------")
+
+        for action in actions:
+            print(action)
+
+
+# command line, python hda_star.py [--workers N] [--sizes 4] [--count 3] [--algorithm 4]
+#   - solves the benchmark instances with the serial graph search and with HDA*, and reports the speedup
+if __name__ == "__main__":
+    from benchmark import generate_instances
+    from search_algorithm import SearchAlgorithm
+
+    parser = argparse.ArgumentParser(description="Compare hash distributed A* with the serial graph search.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4], help="board sizes (default 4)")
+    parser.add_argument("--depths", type=int, nargs="+", help="optimal depths (default depends on the size)")
+    parser.add_argument("--count", type=int, default=3, help="instances of each size and depth (default 3)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the instances (default 1)")
+    parser.add_argument("--algorithm", default='4', help="algorithm choice as in the interactive menu (default 4)")
+    args = parser.parse_args()
+
+    for instance in generate_instances(args.sizes, args.count, args.seed, args.depths):
+        serial = SearchAlgorithm().solve(instance["board"], instance["goal"], args.algorithm)
+        parallel = ParallelSearch(args.workers).solve(instance["board"], instance["goal"], args.algorithm)
+
+        print("{:<12} serial {:>3} moves {:>9,} nodes {:>8.3f} s   {} workers {:>3} moves {:>9,} nodes {:>8.3f} s   "
+              "speedup {:.2f}x".format(instance["id"], serial.depth, serial.num_nodes_expanded, serial.seconds,
+                                       args.workers, parallel.depth, parallel.num_nodes_expanded, parallel.seconds,
+                                       serial.seconds / parallel.seconds))
@@ -0,0 +1,434 @@
+"""
+
+"""
+
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from math import isqrt
+
+from board import get_tile, get_tile_bits, is_valid_state, parse_board
+
+
+# the euclidean distance of a tile is usually irrational, it is kept in fixed point with this many fraction bits
+#   - the sum over the board is then exact integer arithmetic, the same in any order of updates
+#   - the heuristic cost is the sum rounded down, as before, to not overestimate
+EUCLIDEAN_SHIFT = 32
+
+
+class TileHeuristic:
+
+    # a heuristic that is a sum of one cost per tile, the cost only depends on the tile and its index
+    #   - raw values are integers, the heuristic cost is raw >> shift (shift is 0 unless the costs are fixed point)
+    def __init__(self, name, length, tile_cost, shift=0):
+        self.name = name            # the name of the heuristic
+        self.length = length        # the number of squares on the board
+        self.shift = shift          # fraction bits of the raw values
+
+        # table[tile][index], the raw cost of the tile when it is at the index
+        self.table = [[tile_cost(tile, index) for index in range(length)] for tile in range(length)]
+
+        # delta[tile][from_index][to_index], the change of the raw cost when the tile moves
+        self.delta = [[[row[to_index] - row[from_index] for to_index in range(length)]
+                       for from_index in range(length)]
+                      for row in self.table]
+
+    # full evaluation of the raw cost from a list of tiles, O(N^2) for an NxN board
+    def evaluate(self, state):
+        table = self.table
+        raw = 0
+        for index, tile in enumerate(state):
+            raw += table[tile][index]
+        return raw
+
+    # incremental evaluation of the raw cost, O(1)
+    #   - raw is the parent's raw cost, the tile moved from from_index to to_index to give the child state
+    def update(self, raw, tile, from_index, to_index, state):
+        return raw + self.delta[tile][from_index][to_index]
+
+    # get the heuristic cost h(n) from a raw cost
+    def get_cost(self, raw):
+        return raw >> self.shift
+
+
+# the length of the longest increasing subsequence of distinct numbers, O(n log n)
+def get_longest_increasing(numbers):
+    tails = []
+    for number in numbers:
+        position = bisect_left(tails, number)
+        if position == len(tails):
+            tails.append(number)
+        else:
+            tails[position] = number
+    return len(tails)
+
+
+class LinearConflictHeuristic(TileHeuristic):
+
+    # manhattan distance plus 2 moves for each tile that has to leave its goal line to let other tiles pass
+    #   - two tiles in their goal row (or column) are in conflict when their goal order is the reverse of their
+    #     order on the board, one of them has to step out of the line and back
+    #   - the tiles of a line that can stay are the longest run in goal order, only the others are counted, so no
+    #     move is counted twice and the sum over the rows and columns stays admissible
+    #   - raw values are manhattan distance + 2 * conflicts
+    def __init__(self, length, goal_state):
+        super().__init__("linear conflict", length, get_manhattan_tile_cost(length, goal_state))
+
+        self.num_row_col = isqrt(length)        # the number of rows and columns
+        self.bits = get_tile_bits(length)       # the number of bits used for each tile of a packed state
+        self.goal_row_col = get_goal_row_col(goal_state)
+
+        # lines[axis][line], the indexes of a row (axis 0) or a column (axis 1) in board order
+        num_row_col = self.num_row_col
+        self.lines = (
+            [[row * num_row_col + col for col in range(num_row_col)] for row in range(num_row_col)],
+            [[row * num_row_col + col for row in range(num_row_col)] for col in range(num_row_col)],
+        )
+
+    # get the number of tiles that have to leave a line, from its tiles in board order (0 for the blank square)
+    def get_line_conflicts(self, tiles, axis, line):
+        goal_row_col = self.goal_row_col
+        positions = [goal_row_col[tile][1 - axis] for tile in tiles
+                     if tile != 0 and goal_row_col[tile][axis] == line]
+        return len(positions) - get_longest_increasing(positions)
+
+    # full evaluation of the raw cost from a list of tiles
+    def evaluate(self, state):
+        raw = super().evaluate(state)
+        for axis in (0, 1):
+            for line, indexes in enumerate(self.lines[axis]):
+                raw += 2 * self.get_line_conflicts([state[index] for index in indexes], axis, line)
+        return raw
+
+    # incremental evaluation of the raw cost, O(N) for an NxN board
+    #   - a tile moving left or right keeps its order in its row, only the conflicts of the two columns change,
+    #     and the other way around for a tile moving up or down
+    def update(self, raw, tile, from_index, to_index, state):
+        raw += self.delta[tile][from_index][to_index]
+
+        from_row, from_col = divmod(from_index, self.num_row_col)
+        to_row, to_col = divmod(to_index, self.num_row_col)
+        axis, lines = (1, (from_col, to_col)) if from_row == to_row else (0, (from_row, to_row))
+
+        for line in lines:
+            indexes = self.lines[axis][line]
+            child_tiles = [get_tile(state, index, self.bits) for index in indexes]
+
+            # the parent had the tile at from_index and the blank square at to_index
+            parent_tiles = [tile if index == from_index else 0 if index == to_index else child_tile
+                            for index, child_tile in zip(indexes, child_tiles)]
+
+            raw += 2 * (self.get_line_conflicts(child_tiles, axis, line)
+                        - self.get_line_conflicts(parent_tiles, axis, line))
+        return raw
+
+
+# the number of bits of one count of a walking distance configuration, a count is at most 7
+WALKING_COUNT_BITS = 3
+
+# the largest board with walking distance tables, the 5x5 tables would take too long to build
+WALKING_MAX_LENGTH = 16
+
+
+# build the walking distance table of an NxN board by breadth first search from the goal configuration
+#   - a configuration of the rows has count[line][group], the number of tiles in a row that belong in the row
+#     of the group, and the row of the blank square (the same for columns)
+#   - a move of the blank square to the next line takes any one tile of that line into the blank square's line
+#   - configurations are packed into one integer, count[line][group] at bits (line * N + group) * 3 and the
+#     line of the blank square above them
+#   - returns a dictionary of packed configuration -> fewest moves to the goal configuration
+@lru_cache(maxsize=None)
+def build_walking_distance_table(num_row_col, blank_line):
+    blank_offset = num_row_col * num_row_col * WALKING_COUNT_BITS
+
+    # in the goal configuration every line holds its own group, less the blank square
+    goal = blank_line << blank_offset
+    for line in range(num_row_col):
+        count = num_row_col - 1 if line == blank_line else num_row_col
+        goal |= count << ((line * num_row_col + line) * WALKING_COUNT_BITS)
+
+    mask = (1 << WALKING_COUNT_BITS) - 1
+    distance = {goal: 0}
+    queue = deque([goal])
+
+    while queue:
+        configuration = queue.popleft()
+        child_distance = distance[configuration] + 1
+        blank = configuration >> blank_offset
+
+        for line in (blank - 1, blank + 1):
+            if not 0 <= line < num_row_col:
+                continue
+
+            for group in range(num_row_col):
+                from_offset = (line * num_row_col + group) * WALKING_COUNT_BITS
+                if (configuration >> from_offset) & mask == 0:
+                    continue
+
+                # one tile of the group moves from the line into the blank square's line
+                to_offset = (blank * num_row_col + group) * WALKING_COUNT_BITS
+                child = configuration - (1 << from_offset) + (1 << to_offset)
+                child += (line - blank) << blank_offset
+
+                if child not in distance:
+                    distance[child] = child_distance
+                    queue.append(child)
+
+    return distance
+
+
+class WalkingDistanceHeuristic:
+
+    # walking distance (Takahashi), the fewest up and down moves that take every tile to its goal row, counting
+    # the tiles only by their goal row, plus the same for left and right moves and the columns
+    #   - each half relaxes the puzzle, a tile can pass any tile of its line, so the sum is admissible and at least
+    #     the manhattan distance
+    #   - the raw value packs the row configuration above the column configuration, a move changes one count
+    #     of one of the two, so the update is O(1) and h(n) is two table lookups
+    def __init__(self, length, goal_state):
+        if length > WALKING_MAX_LENGTH:
+            raise ValueError("walking distance tables are only built up to {} squares".format(WALKING_MAX_LENGTH))
+
+        self.name = "walking distance"
+        self.length = length
+        self.num_row_col = isqrt(length)
+        self.goal_row_col = get_goal_row_col(goal_state)
+
+        num_row_col = self.num_row_col
+        self.blank_offset = num_row_col * num_row_col * WALKING_COUNT_BITS
+        self.config_bits = self.blank_offset + WALKING_COUNT_BITS
+        self.config_mask = (1 << self.config_bits) - 1
+
+        # the distance tables of the rows and of the columns, by the goal row and column of the blank square
+        blank_row, blank_col = self.goal_row_col[0]
+        self.row_table = build_walking_distance_table(num_row_col, blank_row)
+        self.col_table = build_walking_distance_table(num_row_col, blank_col)
+
+    # full evaluation of the raw value from a list of tiles
+    def evaluate(self, state):
+        num_row_col = self.num_row_col
+        rows = cols = 0
+
+        for index, tile in enumerate(state):
+            row, col = divmod(index, num_row_col)
+            if tile == 0:
+                rows |= row << self.blank_offset
+                cols |= col << self.blank_offset
+                continue
+
+            goal_row, goal_col = self.goal_row_col[tile]
+            rows += 1 << ((row * num_row_col + goal_row) * WALKING_COUNT_BITS)
+            cols += 1 << ((col * num_row_col + goal_col) * WALKING_COUNT_BITS)
+
+        return (rows << self.config_bits) | cols
+
+    # incremental evaluation of the raw value, O(1)
+    #   - the tile moved from from_index to to_index, the blank square moved the other way
+    def update(self, raw, tile, from_index, to_index, state):
+        num_row_col = self.num_row_col
+        from_row, from_col = divmod(from_index, num_row_col)
+        to_row, to_col = divmod(to_index, num_row_col)
+        goal_row, goal_col = self.goal_row_col[tile]
+
+        if from_row == to_row:
+            # a left or right move, the column configuration changes
+            change = ((1 << ((to_col * num_row_col + goal_col) * WALKING_COUNT_BITS))
+                      - (1 << ((from_col * num_row_col + goal_col) * WALKING_COUNT_BITS))
+                      + ((from_col - to_col) << self.blank_offset))
+        else:
+            # an up or down move, the row configuration changes
+            change = ((1 << ((to_row * num_row_col + goal_row) * WALKING_COUNT_BITS))
+                      - (1 << ((from_row * num_row_col + goal_row) * WALKING_COUNT_BITS))
+                      + ((from_row - to_row) << self.blank_offset)) << self.config_bits
+
+        return raw + change
+
+    # get the heuristic cost h(n) from a raw value
+    def get_cost(self, raw):
+        return self.row_table[raw >> self.config_bits] + self.col_table[raw & self.config_mask]
+
+
+# get the default goal state of a board length, the sorted tiles with the blank square last
+#   - index = (tile_number - 1) for every tile
+def get_default_goal_state(length):
+    return tuple(range(1, length)) + (0,)
+
+
+# get the board indexes in the order of a goal layout, the tiles 1, 2, 3, ... are placed in this order and the
+# blank square takes the last index
+#   - default, row by row, blank-first, the same with the blank square first, snake, row by row with every
+#     other row right to left, spiral, clockwise from the top left corner inwards
+def get_layout_order(length, layout):
+    num_row_col = isqrt(length)
+
+    match layout:
+        case "default":
+            return list(range(length))
+        case "blank-first":
+            return list(range(1, length)) + [0]
+        case "snake":
+            return [row * num_row_col + (col if row % 2 == 0 else num_row_col - 1 - col)
+                    for row in range(num_row_col) for col in range(num_row_col)]
+        case "spiral":
+            order = []
+            top, bottom, left, right = 0, num_row_col - 1, 0, num_row_col - 1
+            while top <= bottom and left <= right:
+                order += [top * num_row_col + col for col in range(left, right + 1)]
+                order += [row * num_row_col + right for row in range(top + 1, bottom + 1)]
+                if top < bottom:
+                    order += [bottom * num_row_col + col for col in range(right - 1, left - 1, -1)]
+                if left < right:
+                    order += [row * num_row_col + left for row in range(bottom - 1, top, -1)]
+                top, bottom, left, right = top + 1, bottom - 1, left + 1, right - 1
+            return order
+        case _:
+            raise ValueError("unknown goal layout '{}', expected one of {}".format(layout, ", ".join(GOAL_LAYOUTS)))
+
+
+# the named goal layouts, see get_layout_order
+GOAL_LAYOUTS = ("default", "blank-first", "snake", "spiral")
+
+
+# get the goal state of a named layout for a board length, e.g. spiral on a 3x3 board is 1 2 3 / 8 0 4 / 7 6 5
+def get_goal_state(length, layout="default"):
+    goal_state = [0] * length
+    for tile, index in enumerate(get_layout_order(length, layout)[:-1], 1):
+        goal_state[index] = tile
+    return tuple(goal_state)
+
+
+# get the goal state of a board length from text, a goal layout name (see GOAL_LAYOUTS) or the tiles of the goal
+# state (see board.parse_board)
+#   - raises ValueError if the goal state is not a board of the same length that holds each tile once
+def parse_goal_state(text, length):
+    if text in GOAL_LAYOUTS:
+        return get_goal_state(length, text)
+
+    goal_state = parse_board(text)
+    if len(goal_state) != length or not is_valid_state(goal_state):
+        raise ValueError("the goal state must hold each number from 0 to {} once".format(length - 1))
+    return tuple(goal_state)
+
+
+class GoalLayout:
+
+    # where each tile goes in a goal state, built once for each goal state and shared by every heuristic
+    #   - a heuristic looks up the goal index, row and column of a tile, it never assumes index = tile - 1
+    def __init__(self, goal_state):
+        self.goal_state = tuple(goal_state)     # the goal state
+        self.length = len(goal_state)           # the number of squares on the board
+        self.num_row_col = isqrt(self.length)   # the number of rows and columns
+
+        # goal_index[tile], the index of the tile in the goal state, goal_row_col[tile], its row and column
+        self.goal_index = [0] * self.length
+        for index, tile in enumerate(goal_state):
+            self.goal_index[tile] = index
+        self.goal_row_col = [divmod(index, self.num_row_col) for index in self.goal_index]
+
+
+# get the goal layout of a goal state (a tuple), built once for each goal state
+@lru_cache(maxsize=64)
+def get_goal_layout(goal_state):
+    return GoalLayout(goal_state)
+
+
+# the goal row and column of every tile, from the goal state
+def get_goal_row_col(goal_state):
+    return get_goal_layout(tuple(goal_state)).goal_row_col
+
+
+# uniform cost search, h(n) = 0
+def build_uniform_cost(length, goal_state):
+    return TileHeuristic("uniform cost", length, lambda tile, index: 0)
+
+
+# misplaced tile, 1 for each tile (not the blank square) that is not at its goal index
+def build_misplaced_tile(length, goal_state):
+    goal_index = get_goal_layout(goal_state).goal_index
+
+    def tile_cost(tile, index):
+        return 1 if tile != 0 and goal_index[tile] != index else 0
+
+    return TileHeuristic("misplaced tile", length, tile_cost)
+
+
+# the horizontal and vertical distance of a tile from its goal index, 0 for the blank square
+def get_manhattan_tile_cost(length, goal_state):
+    num_row_col = isqrt(length)
+    goal_row_col = get_goal_row_col(goal_state)
+
+    def tile_cost(tile, index):
+        if tile == 0:
+            return 0
+        row, col = divmod(index, num_row_col)
+        goal_row, goal_col = goal_row_col[tile]
+        return abs(row - goal_row) + abs(col - goal_col)
+
+    return tile_cost
+
+
+# manhattan distance, the sum of the horizontal and vertical distances of each tile from its goal index
+def build_manhattan_distance(length, goal_state):
+    return TileHeuristic("manhattan distance", length, get_manhattan_tile_cost(length, goal_state))
+
+
+# manhattan distance plus linear conflicts, see LinearConflictHeuristic
+def build_linear_conflict(length, goal_state):
+    return LinearConflictHeuristic(length, goal_state)
+
+
+# walking distance, see WalkingDistanceHeuristic
+def build_walking_distance(length, goal_state):
+    return WalkingDistanceHeuristic(length, goal_state)
+
+
+# euclidean distance, the sum of the straight line distances of each tile from its goal index
+#   - for a tile, a is the left right difference and b is the up down difference, c = sqrt(a^2 + b^2)
+#   - isqrt of the scaled square gives c rounded down in fixed point, it is exact when c is an integer
+def build_euclidean_distance(length, goal_state):
+    num_row_col = isqrt(length)
+    goal_row_col = get_goal_row_col(goal_state)
+
+    def tile_cost(tile, index):
+        if tile == 0:
+            return 0
+        row, col = divmod(index, num_row_col)
+        goal_row, goal_col = goal_row_col[tile]
+        square = (row - goal_row) ** 2 + (col - goal_col) ** 2
+        return isqrt(square << (2 * EUCLIDEAN_SHIFT))
+
+    return TileHeuristic("euclidean distance", length, tile_cost, EUCLIDEAN_SHIFT)
+
+
+# additive pattern database, the tables are built ahead of time with pattern_database.py and memory-mapped
+def build_pattern_database(length, goal_state):
+    from pattern_database import load_pattern_database_heuristic
+    return load_pattern_database_heuristic(length, goal_state)
+
+
+# the heuristic for each algorithm choice of Problem.set_algorithm
+HEURISTICS = {
+    '1': build_uniform_cost,
+    '2': build_misplaced_tile,
+    '3': build_euclidean_distance,
+    '4': build_manhattan_distance,
+    '5': build_pattern_database,
+    '6': build_linear_conflict,
+    '7': build_walking_distance,
+}
+
+
+# get the heuristic of an algorithm choice for a board length and goal state, the tables are built once and shared
+#   - goal_state is a tuple, None for the default goal state
+def get_heuristic(algorithm_choice, length, goal_state=None):
+    if goal_state is None:
+        goal_state = get_default_goal_state(length)
+    return build_heuristic(algorithm_choice, length, tuple(goal_state))
+
+
+# build the heuristic tables, the most recently used tables are kept
+@lru_cache(maxsize=64)
+def build_heuristic(algorithm_choice, length, goal_state):
+    if algorithm_choice not in HEURISTICS:
+        raise ValueError("unknown algorithm choice '{}'".format(algorithm_choice))
+    return HEURISTICS[algorithm_choice](length, goal_state)
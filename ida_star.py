@@ -0,0 +1,157 @@
+"""
+
+"""
+
+import time
+
+from board import MOVE_NAMES, NO_MOVE, encode_state, get_move_table, get_tile_bits, is_solvable, move_blank
+from heuristic import get_heuristic
+from result import CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE
+
+
+# the limits are checked after this many expansions
+CHECK_INTERVAL = 1024
+
+
+class SearchStopped(Exception):
+
+    # raised inside the depth first search to unwind it when a limit is reached, see check_limits
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status            # the status of the stopped search, see result.py
+
+
+class IterativeDeepeningSearch:
+
+    def __init__(self, report=print, time_limit=None, node_limit=None, cancel_event=None):
+        self.report = report            # called with a line of text after each iteration, None for no output
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.node_limit = node_limit    # stop after this many nodes are expanded, None for no limit
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of nodes expanded over all iterations
+        self.depth = 0                  # the depth of the goal node
+        self.iterations = []            # (threshold, nodes expanded, seconds) of each iteration
+
+        self.board = []                 # the one board of the search, changed in place and changed back
+        self.moves = []                 # the move codes from the initial state to the current board
+        self.goal_key = None            # goal state packed into one integer, see board.py
+        self.heuristic = None           # the heuristic tables of the algorithm choice, see heuristic.py
+        self.move_table = None          # viable moves of the blank square for each index
+        self.tile_bits = 4              # the number of bits used for each tile of a packed state
+        self.deadline = None            # the time the search has to stop by
+        self.check_at = 0               # the number of nodes expanded at which the limits are checked next
+
+    # iterative deepening A*, a depth first search bounded by f(n) <= threshold
+    #   - the threshold starts at h(initial state), each iteration raises it to the lowest f(n) that was over it
+    #   - memory is the board and the path of moves, no node is kept
+    #   - the time limit, node limit and cancel event are checked every CHECK_INTERVAL expansions (and exactly at
+    #     the node limit), the status says why the search stopped
+    #   - returns the sequence of actions (e.g. ["move up", "move left"]), or None if there is no solution
+    def search(self, initial_state, goal_state, algorithm_choice):
+        # an unsolvable puzzle would raise the threshold forever
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return None
+
+        length = len(initial_state)
+        self.board = list(initial_state)
+        self.moves = []
+        self.num_nodes_expanded = 0
+        self.iterations = []
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.check_at = 0
+
+        self.tile_bits = get_tile_bits(length)
+        self.goal_key = encode_state(goal_state, self.tile_bits)
+        self.heuristic = get_heuristic(algorithm_choice, length, goal_state)
+        self.move_table = get_move_table(length)
+
+        packed = encode_state(self.board, self.tile_bits)
+        raw = self.heuristic.evaluate(self.board)
+        threshold = self.heuristic.get_cost(raw)
+
+        while True:
+            start_time = time.perf_counter()
+            start_nodes = self.num_nodes_expanded
+
+            try:
+                found = self.bounded_search(packed, self.board.index(0), 0, raw, NO_MOVE, threshold)
+            except SearchStopped as stopped:
+                self.status = stopped.status
+                return None
+
+            seconds = time.perf_counter() - start_time
+            nodes = self.num_nodes_expanded - start_nodes
+            self.iterations.append((threshold, nodes, seconds))
+
+            if self.report is not None:
+                self.report("threshold {:>4}  nodes expanded {:>12,}  nodes/sec {:>12,.0f}".format(
+                    threshold, nodes, nodes / seconds if seconds > 0 else 0))
+
+            if found is True:
+                self.status = SOLVED
+                self.depth = len(self.moves)
+                return ["move " + MOVE_NAMES[move] for move in self.moves]
+
+            # no f(n) was over the threshold, every reachable state was searched
+            if found == float("inf"):
+                self.status = NOT_FOUND
+                return None
+
+            threshold = found
+
+    # depth first search from the current board, returns True when the goal is found,
+    # otherwise the lowest f(n) over the threshold
+    def bounded_search(self, packed, blank_index, path_cost, raw, reverse_move, threshold):
+        estimated_cost = path_cost + self.heuristic.get_cost(raw)
+        if estimated_cost > threshold:
+            return estimated_cost
+
+        if packed == self.goal_key:
+            return True
+
+        if self.num_nodes_expanded >= self.check_at:
+            self.check_limits()
+        self.num_nodes_expanded += 1
+        board = self.board
+        lowest = float("inf")
+
+        for target_index, move in self.move_table[blank_index]:
+            # skip the move that undoes the last move
+            if move == reverse_move:
+                continue
+
+            # move the blank square on the board, the tile moves from target_index to blank_index
+            tile = board[target_index]
+            board[blank_index], board[target_index] = tile, 0
+            child = move_blank(packed, blank_index, target_index, self.tile_bits)
+            child_raw = self.heuristic.update(raw, tile, target_index, blank_index, child)
+            self.moves.append(move)
+
+            found = self.bounded_search(child, target_index, path_cost + 1, child_raw, move ^ 1, threshold)
+            if found is True:
+                return True
+
+            # undo the move
+            self.moves.pop()
+            board[blank_index], board[target_index] = 0, tile
+
+            if found < lowest:
+                lowest = found
+
+        return lowest
+
+    # stop the search when a limit is reached, otherwise set when to check again
+    def check_limits(self):
+        if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+            raise SearchStopped(NODE_LIMIT)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchStopped(TIMEOUT)
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchStopped(CANCELLED)
+
+        self.check_at = self.num_nodes_expanded + CHECK_INTERVAL
+        if self.node_limit is not None:
+            self.check_at = min(self.check_at, self.node_limit)
@@ -2,22 +2,36 @@
 Russell & P. Norvig "Artificial Intelligence; A Modern Approach" Prentice-Hall.
 """
 
-from problem import Problem
-from search_algorithm import SearchAlgorithm
+import sys
 
 if __name__ == "__main__":
 
+    # with arguments the boards are solved without asking, see solver.py
+    if len(sys.argv) > 1:
+        from solver import main
+        sys.exit(main())
+
+    from problem import Problem
+    from search_algorithm import SearchAlgorithm
+    from tracing import EXPANSIONS
+
     problem = Problem()
     problem.get_input()
 
     init, goal, oper, algo = problem.get_initial_goal_operators_algorithm()
 
-    search = SearchAlgorithm()
-    node, tree = search.graph_search(init, goal, oper, algo)
+    # reject an unsolvable puzzle before searching
+    rejected = problem.check_solvable()
 
-    if node is None:
-        print("\n\nThe goal state was not found.")
+    if rejected is not None:
+        print("\n\n{}".format(rejected.message))
     else:
-        print("\n\nGoal state found!\n{}".format(node.get_state()))
-        search.output_sequence_of_actions(tree)
-        search.output_results()
+        search = SearchAlgorithm(verbosity=EXPANSIONS)
+        node = search.graph_search(init, goal, oper, algo)
+
+        if node is None:
+            print("\n\nThe goal state was not found.")
+        else:
+            print("\n\nGoal state found!\n{}".format(node.get_state()))
+            search.output_sequence_of_actions(node)
+            search.output_results()
@@ -2,57 +2,115 @@
 
 """
 
+from board import (MOVE_NAMES, NO_MOVE, decode_state, encode_state, get_move_table, get_tile, get_tile_bits,
+                   move_blank, swap_tiles)
+from heuristic import get_default_goal_state, get_goal_layout, get_heuristic
 from math import sqrt
 
 
-class Node:
+# the memory of one stored node with its frontier or explored set entry, in bytes
+#   - measured with tracemalloc on 3x3 graph searches (about 210 to 220 bytes), used to turn a byte budget
+#     into a number of nodes
+NODE_BYTES = 220
+
+
+# get the most nodes that can be kept in memory from a node budget and a byte budget, None for no limit
+def get_node_budget(node_budget=None, byte_budget=None):
+    if byte_budget is not None:
+        byte_nodes = byte_budget // NODE_BYTES
+        node_budget = byte_nodes if node_budget is None else min(node_budget, byte_nodes)
+    return node_budget
+
 
-    def __init__(self):
-        self.state = []             # the current state of the puzzle, a list of integers
-        self.action = None          # viable actions, derived from operators ["up", "down", "left", "right"]
+# get the sequence of actions to get from the initial state to a node (e.g. ["move up", "move left"])
+def get_sequence_of_actions(node):
+    # go to the parent node and save the move that created the node, stop at the start state who has a
+    # parent 'None', O(depth)
+    actions = []
+    while node.get_parent() is not None:
+        actions.append("move " + MOVE_NAMES[node.move])
+        node = node.get_parent()
 
-        self.path_cost = 0          # g(n), the path cost
-        self.heuristic_cost = 0     # h(n), the heuristic cost
-        self.estimated_cost = 0     # f(n) = g(n) + h(n), the estimated cost
+    # we added the moves in the order of goal -> ... -> start, reverse this list to now have start -> ... -> goal
+    actions.reverse()
+    return actions
 
-    # set the data for the state, the list of operators, and the algorithm choice
-    def set_data(self, state, action):
-        self.state = state
-        self.action = action
 
-    # use indices and swap positions based on the operation, list[a], list[b] = list[b], list[a]
+class Node:
+
+    # slots keep every node a small fixed-size record, there is no per-node __dict__
+    __slots__ = ("state", "length", "blank_index", "move", "path_cost", "heuristic_raw", "heuristic_cost",
+                 "estimated_cost", "parent")
+
+    def __init__(self, state=0, length=0, blank_index=0, path_cost=0, parent=None, move=NO_MOVE):
+        self.state = state              # the current state of the puzzle, packed into one integer (see board.py)
+        self.length = length            # the number of squares on the board (e.g. a 3x3 would be length 9)
+        self.blank_index = blank_index  # the index of the blank square (0)
+        self.move = move                # the move code that created this node from the parent, see board.py
+        self.parent = parent            # the node this node was created from, None for the start state
+
+        self.path_cost = path_cost      # g(n), the path cost
+        self.heuristic_raw = 0          # h(n) before rounding, kept for the incremental update, see heuristic.py
+        self.heuristic_cost = 0         # h(n), the heuristic cost
+        self.estimated_cost = 0         # f(n) = g(n) + h(n), the estimated cost
+
+    # set the data for the state from a list of integers
+    #   - the viable actions are derived from the blank square index, the action argument is kept for compatibility
+    def set_data(self, state, action=None):
+        self.state = encode_state(state)
+        self.length = len(state)
+        self.blank_index = state.index(0)
+
+    # use indices and swap positions of two tiles, keeps the blank square index up to date
     def swap_elements(self, index_one, index_two):
-        self.state[index_one], self.state[index_two] = self.state[index_two], self.state[index_one]
+        self.state = swap_tiles(self.state, index_one, index_two, get_tile_bits(self.length))
+
+        if self.blank_index == index_one:
+            self.blank_index = index_two
+        elif self.blank_index == index_two:
+            self.blank_index = index_one
+
+    # create the child node where the blank square moved to the target index, one more step of path cost
+    #   - the heuristic cost is updated from the parent's, only the tile that moved changes it
+    def create_child(self, target_index, move, bits, heuristic):
+        state = move_blank(self.state, self.blank_index, target_index, bits)
+        tile = get_tile(self.state, target_index, bits)
+
+        child = Node(state, self.length, target_index, self.path_cost + 1, self, move)
+        child.heuristic_raw = heuristic.update(self.heuristic_raw, tile, target_index, self.blank_index, state)
+        child.heuristic_cost = heuristic.get_cost(child.heuristic_raw)
+        child.estimated_cost = child.path_cost + child.heuristic_cost
+        return child
 
     # calculated the estimated cost, f(n) = g(n) + h(n)
-    def calculate_estimated_cost(self, algorithm_choice, path_cost):
+    #   - h(n) is towards the goal state, None for the default goal state (sorted tiles, blank square last)
+    def calculate_estimated_cost(self, algorithm_choice, path_cost, goal_state=None):
         # g(n), path cost
         self.path_cost = path_cost
 
-        # h(n), heuristic cost
-        match algorithm_choice:
-            case '1':
-                self.heuristic_cost = 0
-            case '2':
-                self.misplaced_tile_heuristic()
-            case '3':
-                self.euclidean_distance_heuristic()
+        # h(n), heuristic cost, a full evaluation over the board with the tables of the algorithm choice
+        heuristic = get_heuristic(algorithm_choice, self.length, goal_state)
+        self.heuristic_raw = heuristic.evaluate(self.get_state())
+        self.heuristic_cost = heuristic.get_cost(self.heuristic_raw)
 
         # f(n) = g(n) + h(n), estimated cost
         self.estimated_cost = self.path_cost + self.heuristic_cost
 
-    # calculate the misplaced tile heuristic of the node state
-    def misplaced_tile_heuristic(self):
+    # calculate the misplaced tile heuristic of the node state from scratch, without the tables in heuristic.py
+    #   - goal_state is a list or tuple, None for the default goal state
+    def misplaced_tile_heuristic(self, goal_state=None):
+        goal_index = get_goal_layout(tuple(goal_state or get_default_goal_state(self.length))).goal_index
         self.heuristic_cost = 0
 
-        # loop through the state, check if the (index + 1) is the same as the tile number,
-        # if no then there is a misplaced tile, add 1 to the heuristic cost
-        for index, tile in enumerate(self.state):
-            if tile != 0 and index + 1 != tile:
+        # loop through the state, look up the goal index of the tile number, if it is not the index
+        # then there is a misplaced tile, add 1 to the heuristic cost
+        for index, tile in enumerate(self.get_state()):
+            if tile != 0 and goal_index[tile] != index:
                 self.heuristic_cost += 1
 
-    # calculate the euclidean distance heuristic of the node state
-    def euclidean_distance_heuristic(self):
+    # calculate the euclidean distance heuristic of the node state from scratch, without the tables in heuristic.py
+    #   - goal_state is a list or tuple, None for the default goal state
+    def euclidean_distance_heuristic(self, goal_state=None):
         # here is how I calculated the euclidean distance heuristic
         # consider a 3x3 tile puzzle, indices(left) and tile numbers in the goal state(right)
         #
@@ -60,61 +118,37 @@ class Node:
         #   3 4 5       4 5 6
         #   6 7 8       7 8 0
         #
-        # of note is that the index = (tile_number - 1), this doesn't include the blank tile
+        # the goal row and column of each tile number are looked up in the goal layout of the goal state, so any
+        # goal state works, e.g. the blank square first or a spiral
         #
         # the formula is c = sqrt(a^2 + b^2)
         # where 'a' is the left right horizontal difference, and 'b' is the up down vertical difference
         #
         # 1. find left right difference
-        #   - the first row of the NxN matrix will include 0, 1, 2, ..., N - 1
-        #   - the same column number on the next row will be greater by + num_row_col
-        #   - therefore, just use the modulus operator
-        #   - this changes a number in any column to the column number in the first row (e.g.  7 % 3 = 1)
-        #   - do this for (index) and (tile_number - 1), then subtract these 2 values, take absolute value
+        #   - the column of an index is index % num_row_col, the same in every row
+        #   - subtract the goal column of the tile, take absolute value
         #   - the result is how far apart they are from each other horizontally
         #
         # 2. find up down difference
-        #   - the first column of the NxN matrix will include 0, 1 * num_row_col, ..., (N - 1) * num_row_col
-        #   - can loop through row one, do modulus of (index) and (tile_number - 1) to find the column it is in
-        #   - use this to subtract away a number of columns, changing the value to something in column one
-        #   - then divide (index) and (tile_number - 1) by num_row_column
-        #   - this way they're in the range of 0 to (num_row_column - 1), similar to row one
-        #   - subtract the 2 values the same as before, take absolute value
+        #   - the row of an index is index // num_row_col
+        #   - subtract the goal row of the tile, take absolute value
         #   - the result is how far apart they are from each other vertically
+        goal_row_col = get_goal_layout(tuple(goal_state or get_default_goal_state(self.length))).goal_row_col
 
         # set initial values for heuristic cost
         self.heuristic_cost = 0
 
-        # number of rows and columns, fill array with values only for the first row
-        num_row_col = int(sqrt(len(self.state)))
-        row_one = []
-        for number in range(num_row_col):
-            row_one.append(number)
-
-        # variables to hold left/right and up/down distance between the index and tile
-        lr_tile, lr_index, ud_tile, ud_index = 0, 0, 0, 0
-
-        for index, tile in enumerate(self.state):
-
-            if tile != 0 and index + 1 != tile:
-
-                # find horizontal distance
-                lr_tile = (tile - 1) % num_row_col
-                lr_index = index % num_row_col
+        # number of rows and columns
+        num_row_col = int(sqrt(self.length))
 
-                # find vertical distance
-                for row in row_one:
-                    if (tile - 1) % num_row_col == row:
-                        ud_tile = (tile - 1) - row
-                    if index % num_row_col == row:
-                        ud_index = index - row
+        for index, tile in enumerate(self.get_state()):
 
-                ud_tile = int(ud_tile / num_row_col)
-                ud_index = int(ud_index / num_row_col)
+            if tile != 0:
 
                 # horizontal distance, vertical distance
-                left_right = abs(lr_tile - lr_index)
-                up_down = abs(ud_tile - ud_index)
+                goal_row, goal_col = goal_row_col[tile]
+                left_right = abs(index % num_row_col - goal_col)
+                up_down = abs(index // num_row_col - goal_row)
 
                 # euclidean distance: c = sqrt(a^2 + b^2)
                 self.heuristic_cost += sqrt(left_right ** 2 + up_down ** 2)
@@ -122,50 +156,29 @@ class Node:
         # round down to the nearest integer to not overestimate
         self.heuristic_cost = int(self.heuristic_cost)
 
-    # determine viable operators of the blank square from the given state
+    # determine viable operators of the blank square, a lookup in the move table of the board
     def find_operators(self):
+        return [MOVE_NAMES[move] for target_index, move in get_move_table(self.length)[self.blank_index]]
 
-        state_size = len(self.state) - 1
-        num_row_col = int(sqrt(len(self.state)))
-        blank_square_index = self.state.index(0)
-
-        # we have an NxN matrix with the following indices
-        #
-        #    3x3         4x4                5x5
-        #   0 1 2     0 1  2  3        0  1  2  3  4
-        #   3 4 5     4 5  6  7        5  6  7  8  9
-        #   6 7 8     8 9 10 11       10 11 12 13 14
-        #
-        # how to determine if an action is viable based on the index
-        #   - up:    new_index = current_index - num_row_col  (cannot when new index is less than 0)
-        #   - down:  new_index = current_index + num_row_col  (cannot when new index is greater than state size)
-        #   - left:  new_index = current_index - 1            (cannot when current index is multiple of num_row_col)
-        #   - right: new_index = current_index + 1            (cannot when new index is multiple of num_row_col)
-
-        # remove operators that are not viable, left with viable actions
-        if blank_square_index - num_row_col < 0:
-            self.action.remove('up')
-
-        if blank_square_index + num_row_col > state_size:
-            self.action.remove('down')
-
-        if blank_square_index % num_row_col == 0:
-            self.action.remove('left')
-
-        if (blank_square_index + 1) % num_row_col == 0:
-            self.action.remove('right')
-
-    # get the state of the node
+    # get the state of the node as a list of integers
     def get_state(self):
-        return self.state
+        return decode_state(self.state, self.length)
 
     # get the viable actions of the node
     def get_actions(self):
-        return self.action
+        return self.find_operators()
 
     # get the data for the state and estimated cost
     def get_data(self):
-        return tuple((self.state, self.estimated_cost))
+        return tuple((self.get_state(), self.estimated_cost))
+
+    # get the hashable key of the state, used by the frontier and explored set
+    def get_key(self):
+        return self.state
+
+    # get the path cost
+    def get_path_cost(self):
+        return self.path_cost
 
     # get the path cost and heuristic cost
     def get_path_heuristic_costs(self):
@@ -175,10 +188,14 @@ class Node:
     def get_estimated_cost(self):
         return self.estimated_cost
 
+    # get the parent of the node
+    def get_parent(self):
+        return self.parent
+
     # get the length of the current state list (e.g. a 3x3 would be length 9)
     def get_state_length(self):
-        return len(self.state)
+        return self.length
 
     # get the index of the blank square (0)
     def get_blank_square_index(self):
-        return self.state.index(0)
+        return self.blank_index
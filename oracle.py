@@ -0,0 +1,239 @@
+"""
+
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from functools import lru_cache
+from math import factorial
+
+from board import MOVE_NAMES, decode_state, encode_state, get_move_table, get_tile_bits, move_blank
+from heuristic import HEURISTICS, get_default_goal_state, get_heuristic
+
+
+# the largest board with a full distance table, the 3x3 board has 9! / 2 = 181,440 reachable states
+MAX_LENGTH = 9
+
+# the directory the tables are saved to and loaded from
+TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+
+# file layout: magic, board length, goal state (1 byte per square), then one byte per permutation rank
+MAGIC = b"ORC1"
+
+# the distance of a state that cannot be reached from the goal state
+UNREACHED = 255
+
+
+# get the default path of the distance table of a goal state
+def get_table_path(goal_state):
+    return os.path.join(TABLE_DIRECTORY, "oracle_{}.bin".format("".join(str(tile) for tile in goal_state)))
+
+
+# the rank of a permutation of 0 to length - 1 by its Lehmer code, a number in range(length!)
+#   - digit i of the code is the number of later items that are smaller than item i
+def rank_permutation(state):
+    length = len(state)
+    rank = 0
+    for i in range(length):
+        smaller = 0
+        for later in state[i + 1:]:
+            if later < state[i]:
+                smaller += 1
+        rank += smaller * factorial(length - 1 - i)
+    return rank
+
+
+# the permutation of 0 to length - 1 with the given rank, the inverse of rank_permutation
+def unrank_permutation(rank, length):
+    items = list(range(length))
+    state = []
+    for i in range(length):
+        digit, rank = divmod(rank, factorial(length - 1 - i))
+        state.append(items.pop(digit))
+    return state
+
+
+# build the distance table with one breadth first search from the goal state
+#   - the entry of a rank is the number of moves from that state to the goal state, UNREACHED if it cannot be reached
+def build_distance_table(goal_state):
+    length = len(goal_state)
+    if length > MAX_LENGTH:
+        raise ValueError("a full distance table is only possible up to {} squares".format(MAX_LENGTH))
+
+    bits = get_tile_bits(length)
+    move_table = get_move_table(length)
+
+    # distances of the packed states, by breadth first search layer
+    goal = encode_state(goal_state, bits)
+    distance = {goal: 0}
+    queue = deque([(goal, goal_state.index(0))])
+
+    while queue:
+        packed, blank_index = queue.popleft()
+        child_distance = distance[packed] + 1
+
+        for target_index, move in move_table[blank_index]:
+            child = move_blank(packed, blank_index, target_index, bits)
+            if child not in distance:
+                distance[child] = child_distance
+                queue.append((child, target_index))
+
+    table = bytearray([UNREACHED]) * factorial(length)
+    for packed, moves in distance.items():
+        table[rank_permutation(decode_state(packed, length, bits))] = moves
+
+    return table
+
+
+# build the distance table of a goal state and save it, report is called with a summary line (None for no output)
+def build_oracle(goal_state, path=None, report=print):
+    path = path or get_table_path(goal_state)
+
+    start_time = time.perf_counter()
+    table = build_distance_table(goal_state)
+    reached = len(table) - table.count(UNREACHED)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("B", len(goal_state)))
+        file.write(bytes(goal_state))
+        file.write(table)
+
+    if report is not None:
+        report("{:,} states reached, greatest distance {}, {:,} bytes written to {} in {:.1f} s".format(
+            reached, max(moves for moves in table if moves != UNREACHED), os.path.getsize(path), path,
+            time.perf_counter() - start_time))
+    return path
+
+
+class DistanceOracle:
+
+    # open a distance table, the table is memory-mapped and not read into memory
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[:4] != MAGIC:
+            raise ValueError("'{}' is not a distance table file".format(path))
+
+        self.length = self.data[4]
+        self.goal_state = list(self.data[5:5 + self.length])
+        self.offset = 5 + self.length
+
+        if len(self.data) != self.offset + factorial(self.length):
+            raise ValueError("'{}' is truncated or has the wrong size".format(path))
+
+    # get the exact number of moves from a state (a list of integers) to the goal state, None if it cannot be reached
+    def get_distance(self, state):
+        moves = self.data[self.offset + rank_permutation(state)]
+        return None if moves == UNREACHED else moves
+
+    # solve a state with no search, each move goes to a neighbour one move closer to the goal state, O(depth)
+    #   - returns the sequence of actions (e.g. ["move up", "move left"]), or None if there is no solution
+    #   - raises ValueError if the state is not the size of the table
+    def solve(self, state):
+        if len(state) != self.length:
+            raise ValueError("the distance table is for {} squares, the state has {}".format(self.length, len(state)))
+
+        distance = self.get_distance(state)
+        if distance is None:
+            return None
+
+        move_table = get_move_table(self.length)
+        board = list(state)
+        blank_index = board.index(0)
+        actions = []
+
+        while distance > 0:
+            for target_index, move in move_table[blank_index]:
+                board[blank_index], board[target_index] = board[target_index], 0
+                if self.get_distance(board) == distance - 1:
+                    actions.append("move " + MOVE_NAMES[move])
+                    blank_index = target_index
+                    distance -= 1
+                    break
+                board[blank_index], board[target_index] = 0, board[blank_index]
+
+        return actions
+
+    # check a heuristic against the exact distances of every reachable state
+    #   - returns (states, overestimates, mean of h(n) / h*(n)), a heuristic is admissible if it has no overestimates
+    def check_heuristic(self, algorithm_choice):
+        heuristic = get_heuristic(algorithm_choice, self.length, tuple(self.goal_state))
+        states = overestimates = 0
+        ratio = 0.0
+
+        for rank in range(factorial(self.length)):
+            moves = self.data[self.offset + rank]
+            if moves == UNREACHED:
+                continue
+
+            cost = heuristic.get_cost(heuristic.evaluate(unrank_permutation(rank, self.length)))
+            states += 1
+            if cost > moves:
+                overestimates += 1
+            if moves > 0:
+                ratio += cost / moves
+
+        return states, overestimates, ratio / max(states - 1, 1)
+
+    # close the memory map and the file
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+# load the distance oracle of a goal state, it is built and saved the first time, then opened once per process
+#   - raises ValueError if the goal state has more than MAX_LENGTH squares
+def load_oracle(goal_state=None, report=print):
+    goal_state = tuple(goal_state or get_default_goal_state(MAX_LENGTH))
+    if len(goal_state) > MAX_LENGTH:
+        raise ValueError("a full distance table is only possible up to {} squares".format(MAX_LENGTH))
+    path = get_table_path(goal_state)
+    if not os.path.exists(path):
+        build_oracle(list(goal_state), path, report)
+    return open_oracle(path)
+
+
+# open a distance table once, later calls share the same memory map
+@lru_cache(maxsize=None)
+def open_oracle(path):
+    return DistanceOracle(path)
+
+
+# solve a 3x3 (or smaller) state with the distance oracle, no search
+#   - goal_state None is the default goal state of the size of the initial state
+#   - returns the sequence of actions, or None if the goal state cannot be reached
+#   - raises ValueError if the board is larger than 3x3 or not the size of the goal state
+def solve_with_oracle(initial_state, goal_state=None):
+    goal_state = goal_state or get_default_goal_state(len(initial_state))
+    return load_oracle(goal_state, report=None).solve(initial_state)
+
+
+# command line, python oracle.py build|check [--goal "1 2 3 4 5 6 7 8 0"]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact distance table of every 3x3 state.")
+    parser.add_argument("command", choices=["build", "check"],
+                        help="build the table, or check the heuristics against it")
+    parser.add_argument("--goal", help="goal state as numbers separated by spaces (default 1 2 3 4 5 6 7 8 0)")
+    args = parser.parse_args()
+
+    goal = [int(tile) for tile in args.goal.split()] if args.goal else list(get_default_goal_state(MAX_LENGTH))
+
+    if args.command == "build":
+        build_oracle(goal)
+    else:
+        oracle = load_oracle(goal)
+        for choice in sorted(HEURISTICS):
+            try:
+                count, over, mean = oracle.check_heuristic(choice)
+            except (FileNotFoundError, ValueError) as error:
+                print("algorithm {}: skipped, {}".format(choice, error))
+                continue
+            print("algorithm {}: {:,} states, {:,} overestimates, mean h(n) / h*(n) = {:.3f}".format(
+                choice, count, over, mean))
@@ -0,0 +1,282 @@
+"""
+
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from math import isqrt, perm
+
+from board import get_move_table, get_tile_bits
+
+
+# additive disjoint partitions of the tiles, for each board length
+#   - each pattern is a group of tiles, the tables of disjoint patterns can be added and stay admissible
+#   - the build visits every (rank, blank square) pair, perm(length, k) * length of them for a pattern of k tiles,
+#     the 6-6-3 partition is about 92 million for each 6 tile pattern (several minutes each in pure Python),
+#     a 7-8 partition would be 8.3 billion for the 8 tile pattern and cannot be built this way
+PARTITIONS = {
+    9: {
+        "4-4": ((1, 2, 3, 4), (5, 6, 7, 8)),
+    },
+    16: {
+        "5-5-5": ((1, 5, 6, 9, 13), (2, 3, 4, 7, 8), (10, 11, 12, 14, 15)),
+        "6-6-3": ((1, 5, 6, 9, 10, 13), (7, 8, 11, 12, 14, 15), (2, 3, 4)),
+    },
+    25: {
+        "6x4": ((1, 2, 6, 7), (3, 4, 5, 8), (9, 10, 14, 15), (11, 12, 16, 17), (13, 18, 21, 22), (19, 20, 23, 24)),
+    },
+}
+
+# the partition used when none is given, the larger 4x4 partitions take much longer to build
+DEFAULT_PARTITIONS = {9: "4-4", 16: "5-5-5", 25: "6x4"}
+
+# the directory the tables are saved to and loaded from
+TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+
+# file layout: magic, board length, number of patterns, goal state (1 byte per square),
+# then for each pattern its number of tiles and the tiles (1 byte each), then the tables one after another
+MAGIC = b"PDB1"
+
+# a table entry that was never reached by the search
+UNREACHED = 255
+
+
+# get the default path of the pattern database file for a board length and goal state
+#   - the tables of the default goal state (sorted tiles, blank square last) keep the plain name, the tables of
+#     any other goal state have the goal tiles in the name, e.g. pdb_3x3_0-1-2-3-4-5-6-7-8.bin
+def get_table_path(length, goal_state=None):
+    num_row_col = isqrt(length)
+    name = "pdb_{}x{}".format(num_row_col, num_row_col)
+    if goal_state is not None and list(goal_state) != list(range(1, length)) + [0]:
+        name += "_" + "-".join(str(tile) for tile in goal_state)
+    return os.path.join(TABLE_DIRECTORY, name + ".bin")
+
+
+# the rank of the positions of the pattern tiles, a number in range(length! / (length - k)!)
+#   - each position is counted among the positions not used by earlier tiles, a mixed radix number
+def rank_positions(positions, length):
+    rank = 0
+    for i, position in enumerate(positions):
+        smaller = position
+        for earlier in positions[:i]:
+            if earlier < position:
+                smaller -= 1
+        rank = rank * (length - i) + smaller
+    return rank
+
+
+# build the table of one pattern with a retrograde breadth first search from the goal state
+#   - a search state is the positions of the pattern tiles and the position of the blank square
+#   - moving a pattern tile costs 1, moving any other tile costs 0, so the tables of disjoint patterns are additive
+#   - the entry of a rank is the lowest cost over all the positions of the blank square
+def build_pattern_table(pattern, goal_state):
+    length = len(goal_state)
+    targets = [tuple(target_index for target_index, move in moves) for moves in get_move_table(length)]
+
+    size = perm(length, len(pattern))
+    table = bytearray([UNREACHED]) * size
+
+    # one bit for each (rank, blank square) pair, slot = rank * length + blank index
+    visited = bytearray((size * length + 7) // 8)
+
+    # 0-1 breadth first search, cost 0 moves go to the front of the queue, cost 1 moves to the back
+    start = tuple(goal_state.index(tile) for tile in pattern)
+    queue = deque([(start, rank_positions(start, length), goal_state.index(0), 0)])
+
+    while queue:
+        positions, rank, blank_index, cost = queue.popleft()
+
+        slot = rank * length + blank_index
+        if visited[slot >> 3] & (1 << (slot & 7)):
+            continue
+        visited[slot >> 3] |= 1 << (slot & 7)
+
+        # the first time a rank is reached is with the lowest cost
+        if table[rank] == UNREACHED:
+            table[rank] = cost
+
+        for target_index in targets[blank_index]:
+            if target_index in positions:
+                # a pattern tile moves into the blank square
+                i = positions.index(target_index)
+                moved = positions[:i] + (blank_index,) + positions[i + 1:]
+                moved_rank = rank_positions(moved, length)
+                moved_slot = moved_rank * length + target_index
+                if not visited[moved_slot >> 3] & (1 << (moved_slot & 7)):
+                    queue.append((moved, moved_rank, target_index, cost + 1))
+            else:
+                next_slot = rank * length + target_index
+                if not visited[next_slot >> 3] & (1 << (next_slot & 7)):
+                    queue.appendleft((positions, rank, target_index, cost))
+
+    return table
+
+
+# build every table of a partition and save them to one file
+def build_pattern_database(goal_state, patterns, path, report=print):
+    length = len(goal_state)
+    tables = []
+
+    for pattern in patterns:
+        start_time = time.perf_counter()
+        tables.append(build_pattern_table(pattern, goal_state))
+        report("pattern {:<28} {:>12,} entries {:>8.1f} MB {:>8.1f} s".format(
+            str(pattern), len(tables[-1]), len(tables[-1]) / 1e6, time.perf_counter() - start_time))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("BB", length, len(patterns)))
+        file.write(bytes(goal_state))
+        for pattern in patterns:
+            file.write(struct.pack("B", len(pattern)))
+            file.write(bytes(pattern))
+        for table in tables:
+            file.write(table)
+
+    report("total {:,} bytes written to {}".format(os.path.getsize(path), path))
+
+
+class PatternDatabase:
+
+    # open a pattern database file, the tables are memory-mapped and not read into memory
+    #   - pages are loaded on first use and shared by every process that maps the same file
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[:4] != MAGIC:
+            raise ValueError("'{}' is not a pattern database file".format(path))
+
+        self.length, pattern_count = struct.unpack_from("BB", self.data, 4)
+        offset = 6
+        self.goal_state = list(self.data[offset:offset + self.length])
+        offset += self.length
+
+        self.patterns = []          # the tiles of each pattern
+        for _ in range(pattern_count):
+            size = self.data[offset]
+            self.patterns.append(tuple(self.data[offset + 1:offset + 1 + size]))
+            offset += 1 + size
+
+        self.offsets = []           # the offset of each table in the file
+        for pattern in self.patterns:
+            self.offsets.append(offset)
+            offset += perm(self.length, len(pattern))
+
+        if offset != len(self.data):
+            raise ValueError("'{}' is truncated or has the wrong size".format(path))
+
+    # get the cost of a pattern from the positions of its tiles
+    def lookup(self, pattern_index, positions):
+        return self.data[self.offsets[pattern_index] + rank_positions(positions, self.length)]
+
+    # close the memory map and the file
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class PatternDatabaseHeuristic:
+
+    # the additive pattern database heuristic, the sum of the costs of the disjoint patterns
+    #   - the raw value keeps the cost of each pattern in its own 8 bits, so a move only looks up one pattern
+    def __init__(self, database):
+        self.name = "pattern database"
+        self.database = database
+        self.length = database.length
+        self.bits = get_tile_bits(database.length)
+
+        # the pattern index of each tile, None for the blank square and tiles in no pattern
+        self.tile_pattern = [None] * self.length
+        for pattern_index, pattern in enumerate(database.patterns):
+            for tile in pattern:
+                self.tile_pattern[tile] = pattern_index
+
+    # full evaluation of the raw cost from a list of tiles
+    def evaluate(self, state):
+        raw = 0
+        for pattern_index, pattern in enumerate(self.database.patterns):
+            positions = tuple(state.index(tile) for tile in pattern)
+            raw |= self.database.lookup(pattern_index, positions) << (8 * pattern_index)
+        return raw
+
+    # incremental evaluation of the raw cost, only the pattern of the moved tile is looked up again
+    def update(self, raw, tile, from_index, to_index, state):
+        pattern_index = self.tile_pattern[tile]
+        if pattern_index is None:
+            return raw
+
+        # the positions of the pattern tiles in the child state
+        pattern = self.database.patterns[pattern_index]
+        mask = (1 << self.bits) - 1
+        positions = [0] * len(pattern)
+        for index in range(self.length):
+            square = (state >> (index * self.bits)) & mask
+            if self.tile_pattern[square] == pattern_index:
+                positions[pattern.index(square)] = index
+
+        shift = 8 * pattern_index
+        cost = self.database.lookup(pattern_index, tuple(positions))
+        return raw & ~(0xFF << shift) | (cost << shift)
+
+    # get the heuristic cost h(n) from a raw cost, the sum of the pattern costs
+    def get_cost(self, raw):
+        cost = 0
+        while raw:
+            cost += raw & 0xFF
+            raw >>= 8
+        return cost
+
+
+# load the pattern database heuristic of a board length and goal state from its default path
+#   - the tables are only valid for the goal state they were built from
+def load_pattern_database_heuristic(length, goal_state):
+    path = get_table_path(length, goal_state)
+    if not os.path.exists(path):
+        raise FileNotFoundError("no pattern database at '{}', build it with: python pattern_database.py {} --goal "
+                                "\"{}\"".format(path, isqrt(length), " ".join(str(tile) for tile in goal_state)))
+
+    database = PatternDatabase(path)
+    if tuple(database.goal_state) != tuple(goal_state):
+        database.close()
+        raise ValueError("the pattern database at '{}' was built for the goal state {}, not {}"
+                         .format(path, database.goal_state, list(goal_state)))
+    return PatternDatabaseHeuristic(database)
+
+
+# build tool, python pattern_database.py N [--partition NAME] [--goal GOAL] [--output PATH]
+#   - GOAL is a goal layout (e.g. spiral, see heuristic.GOAL_LAYOUTS) or the tiles of the goal state
+if __name__ == "__main__":
+    from heuristic import parse_goal_state
+
+    parser = argparse.ArgumentParser(description="Build an additive pattern database for an NxN puzzle.")
+    parser.add_argument("size", type=int, help="number of rows and columns of the board, e.g. 4")
+    parser.add_argument("--partition", help="name of the partition of the tiles, e.g. 6-6-3")
+    parser.add_argument("--goal", default="default", help="goal layout or tiles of the goal state (default: sorted "
+                                                          "tiles, blank square last)")
+    parser.add_argument("--output", help="path of the table file")
+    args = parser.parse_args()
+
+    board_length = args.size * args.size
+    if board_length not in PARTITIONS:
+        parser.error("no partitions for a {}x{} board".format(args.size, args.size))
+
+    partition = args.partition or DEFAULT_PARTITIONS[board_length]
+    if partition not in PARTITIONS[board_length]:
+        parser.error("unknown partition '{}', expected one of {}".format(partition, sorted(PARTITIONS[board_length])))
+
+    try:
+        goal = list(parse_goal_state(args.goal, board_length))
+    except ValueError as error:
+        parser.error(str(error))
+    output = args.output or get_table_path(board_length, goal)
+
+    print("building the {} partition for the {}x{} board".format(partition, args.size, args.size))
+    begin = time.perf_counter()
+    build_pattern_database(goal, PARTITIONS[board_length][partition], output)
+    print("build time {:.1f} s".format(time.perf_counter() - begin))
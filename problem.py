@@ -2,33 +2,42 @@
 
 """
 
+from board import is_solvable, is_valid_state
+from heuristic import GOAL_LAYOUTS, HEURISTICS, WALKING_MAX_LENGTH, get_heuristic, parse_goal_state
+from result import UNSOLVABLE, SearchResult
+
+
 class Problem:
 
     def __init__(self):
         self.initial_state = []     # the initial state
         self.goal_state = []        # the goal state
         self.operators = []         # the available operators
-        self.algorithm_choice = 0   # which of 3 algorithms the user wants
+        self.algorithm_choice = 0   # which of the algorithms the user wants
 
     # determine default or custom puzzle from the user
     def get_input(self):
         print("\nHello. This is the 8 puzzle solver.\n")
-        user_input = input("Type '1' for the default puzzle, or '2' to enter your own.\n")
-
-        # NOTE: uncomment below to bypass typing in input to run code
-        # print("Type '1' for the default puzzle, or '2' to enter your own.")
-        # user_input = '1'
-        # print(user_input)
-
-        # match the users input
-        match user_input:
-            case '1':
-                self.set_default_puzzle()
-            case '2':
-                self.set_custom_puzzle()
-            case _:
-                print("ERROR. Please enter 1 or 2.\n")
-                self.get_input()
+
+        # ask again until the input is valid
+        while True:
+            user_input = input("Type '1' for the default puzzle, or '2' to enter your own.\n")
+
+            # NOTE: uncomment below to bypass typing in input to run code
+            # print("Type '1' for the default puzzle, or '2' to enter your own.")
+            # user_input = '1'
+            # print(user_input)
+
+            # match the users input
+            match user_input:
+                case '1':
+                    self.set_default_puzzle()
+                    break
+                case '2':
+                    self.set_custom_puzzle()
+                    break
+                case _:
+                    print("ERROR. Please enter 1 or 2.\n")
 
         self.set_operators()
         self.set_algorithm()
@@ -71,26 +80,63 @@ class Problem:
 
     # get the custom puzzle from the user
     def set_custom_puzzle(self):
-        print("\nEnter your puzzle.\nUse spaces between the numbers.\n('0' for the blank square)\n")
-
-        # get row 1 of user input as a list of strings
-        # uses .split() to not consider the blank spaces ' ' between the numbers
-        self.initial_state = input("Enter row 1: ").split()
-
-        # numer of rows, columns is the length of row 1 input list
-        num_row_col = len(self.initial_state)
-
-        # get input for remaining rows, add to initial state list
-        for row in range(num_row_col - 1):
-            self.initial_state += input("Enter row {}: ".format(row + 2)).split()
-
-        self.set_goal_state()
+        # ask again until the puzzle is valid
+        while True:
+            print("\nEnter your puzzle.\nUse spaces between the numbers.\n('0' for the blank square)\n")
+
+            # get row 1 of user input as a list of strings
+            # uses .split() to not consider the blank spaces ' ' between the numbers
+            self.initial_state = input("Enter row 1: ").split()
+
+            # numer of rows, columns is the length of row 1 input list
+            num_row_col = len(self.initial_state)
+
+            # get input for remaining rows, add to initial state list
+            for row in range(num_row_col - 1):
+                self.initial_state += input("Enter row {}: ".format(row + 2)).split()
+
+            # the puzzle must be a square board of the numbers 0 to (N * N - 1), each used once
+            if all(item.isdigit() for item in self.initial_state) and \
+                    is_valid_state([int(item) for item in self.initial_state]):
+                break
+
+            print("ERROR. Please enter each number from 0 to {} once.".format(num_row_col * num_row_col - 1))
+
+        self.set_custom_goal()
+
+    # get the goal state of the custom puzzle from the user, the default goal state when nothing is entered
+    def set_custom_goal(self):
+        length = len(self.initial_state)
+
+        # ask again until the goal state is valid
+        while True:
+            user_input = input("\nEnter your goal state on one line, or a layout ({}).\n"
+                               "Press enter for the default goal state.\n".format(", ".join(GOAL_LAYOUTS))).strip()
+
+            try:
+                self.set_goal_state(parse_goal_state(user_input or "default", length))
+                return
+            except ValueError:
+                print("ERROR. Please enter each number from 0 to {} once.".format(length - 1))
+
+    # set the puzzle without asking the user, the initial state is a list of integers
+    #   - goal_state is any arrangement of the same tiles, None for the default goal state
+    def set_puzzle(self, initial_state, algorithm_choice, goal_state=None):
+        self.initial_state = list(initial_state)
+        self.set_goal_state(goal_state)
+        self.set_operators()
+        self.algorithm_choice = algorithm_choice
 
-    # set the goal state based on the initial state
-    def set_goal_state(self):
+    # set the goal state based on the initial state, or the goal state given
+    def set_goal_state(self, goal_state=None):
         # list comprehension, convert list of strings to list of integers
         self.initial_state = [int(item) for item in self.initial_state]
 
+        # any goal state can be given, the heuristics look up where each tile goes in it
+        if goal_state is not None:
+            self.goal_state = [int(tile) for tile in goal_state]
+            return
+
         # the goal state is the sorted initial state, modified further below
         self.goal_state = sorted(self.initial_state)
 
@@ -99,6 +145,14 @@ class Problem:
         zero = self.goal_state.pop(0)
         self.goal_state.append(zero)
 
+    # check that the goal state can be reached from the initial state, this is done before any search
+    #   - returns a result with the unsolvable status if it cannot be reached, None if it can
+    def check_solvable(self):
+        if is_solvable(self.initial_state, self.goal_state):
+            return None
+
+        return SearchResult(UNSOLVABLE, message="The puzzle is unsolvable, the goal state cannot be reached.")
+
     # set the operators the blank square can do for the puzzle, moving up/down/left/right
     def set_operators(self):
         self.operators = ["up", "down", "left", "right"]
@@ -106,16 +160,45 @@ class Problem:
     # determine which algorithm the user wants to use to solve the puzzle
     def set_algorithm(self):
         print("\nEnter your algorithm choice.")
-        self.algorithm_choice = input("1) Uniform Cost Search\n"
-                                      "2) A* with the Misplaced Tile heuristic\n"
-                                      "3) A* with the Euclidean distance heuristic\n")
-
-        # NOTE: uncomment below to bypass typing in input to run code
-        # print("1) Uniform Cost Search\n"
-        #       "2) A* with the Misplaced Tile heuristic\n"
-        #       "3) A* with the Euclidean distance heuristic")
-        # self.algorithm_choice = '3'
-        # print(self.algorithm_choice)
+
+        # ask again until the choice is one of the menu
+        while True:
+            self.algorithm_choice = input("1) Uniform Cost Search\n"
+                                          "2) A* with the Misplaced Tile heuristic\n"
+                                          "3) A* with the Euclidean distance heuristic\n"
+                                          "4) A* with the Manhattan distance heuristic\n"
+                                          "5) A* with the additive pattern database heuristic\n"
+                                          "6) A* with the Manhattan distance and linear conflict heuristic\n"
+                                          "7) A* with the walking distance heuristic\n").strip()
+
+            # NOTE: uncomment below to bypass typing in input to run code
+            # print("1) Uniform Cost Search\n"
+            #       "2) A* with the Misplaced Tile heuristic\n"
+            #       "3) A* with the Euclidean distance heuristic\n"
+            #       "4) A* with the Manhattan distance heuristic\n"
+            #       "5) A* with the additive pattern database heuristic\n"
+            #       "6) A* with the Manhattan distance and linear conflict heuristic\n"
+            #       "7) A* with the walking distance heuristic")
+            # self.algorithm_choice = '3'
+            # print(self.algorithm_choice)
+
+            if self.algorithm_choice not in HEURISTICS:
+                print("ERROR. Please enter a number from 1 to {}.\n".format(len(HEURISTICS)))
+            elif self.algorithm_choice == '7' and len(self.initial_state) > WALKING_MAX_LENGTH:
+                print("ERROR. The walking distance heuristic only works up to 4x4 puzzles, please choose another.\n")
+            elif self.algorithm_choice == '5' and not self.has_pattern_database():
+                continue
+            else:
+                break
+
+    # check that the pattern database of the puzzle is built, the error says how to build it when it is not
+    def has_pattern_database(self):
+        try:
+            get_heuristic('5', len(self.initial_state), self.goal_state)
+        except (OSError, ValueError) as error:
+            print("ERROR. {}\nPlease build it, or choose another.\n".format(error))
+            return False
+        return True
 
     # return the initial state, goal state, operators, and algorithm choice of the puzzle
     def get_initial_goal_operators_algorithm(self):
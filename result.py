@@ -0,0 +1,45 @@
+"""
+
+"""
+
+# the status of a search result
+SOLVED = "solved"               # the goal state was found
+INVALID = "invalid"             # the initial state, goal state or heuristic cannot be used, no search was done
+UNSOLVABLE = "unsolvable"       # the goal state cannot be reached from the initial state, no search was done
+NOT_FOUND = "not found"         # the search ended without finding the goal state
+TIMEOUT = "timeout"             # the search was stopped by its time limit
+NODE_LIMIT = "node limit"       # the search was stopped by its limit on nodes expanded
+BUDGET_EXCEEDED = "budget exceeded"  # the search needed more nodes in memory than its memory budget
+CANCELLED = "cancelled"         # the search was stopped because its caller no longer needed it
+
+
+class SearchResult:
+
+    def __init__(self, status, actions=None, num_nodes_expanded=0, seconds=0.0, message="", bound=1):
+        self.status = status                        # one of the statuses above
+        self.actions = actions                      # the sequence of actions (e.g. ["move up"]), None if not solved
+        self.depth = None if actions is None else len(actions)  # the depth of the goal node
+        self.num_nodes_expanded = num_nodes_expanded  # the number of nodes expanded
+        self.seconds = seconds                      # the time the search took
+        self.message = message                      # a message for the user
+        self.bound = bound                          # the solution costs at most bound times the optimal cost
+
+    # check if the goal state was found
+    def is_solved(self):
+        return self.status == SOLVED
+
+    # get the result as a dictionary, e.g. for writing it as JSON
+    #   - the bound is only there when the solution might not be optimal, the message when there is one
+    def to_dict(self):
+        result = {
+            "status": self.status,
+            "actions": self.actions,
+            "depth": self.depth,
+            "nodes_expanded": self.num_nodes_expanded,
+            "seconds": round(self.seconds, 6),
+        }
+        if self.bound != 1:
+            result["bound"] = self.bound
+        if self.message:
+            result["message"] = self.message
+        return result
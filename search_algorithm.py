@@ -2,300 +2,284 @@
 
 """
 
-from node import Node
-from tree import Tree
-from math import sqrt
+from closed_set import ClosedSet
+from board import encode_state, get_move_table, get_tile_bits, is_solvable
+from frontier import create_frontier
+from heuristic import get_heuristic
+from node import Node, get_node_budget, get_sequence_of_actions
+from result import BUDGET_EXCEEDED, CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE, SearchResult
+from stats import SearchStats, TimedHeuristic
+from tracing import EXPANSIONS, QUIET, SUMMARY, ExpansionEvent, Tracer, write_expansion
+import time
 
 
 class SearchAlgorithm:
 
-    def __init__(self):
-        self.frontier = {}              # frontier, list of leaf nodes that can be expanded
-        self.explored_set = {}          # explored set, set of the nodes that have been expanded
+    def __init__(self, frontier_type="heap", check_heuristic=False, verbosity=QUIET, tracer=None,
+                 node_limit=None, time_limit=None, node_budget=None, byte_budget=None, weight=1, timed=False,
+                 cancel_event=None):
+        self.verbosity = verbosity      # QUIET, SUMMARY or EXPANSIONS (print every expanded node), see tracing.py
+        self.tracer = tracer            # called with every expanded node, see tracing.Tracer, None for no tracing
+        self.node_limit = node_limit    # stop after this many nodes are expanded, None for no limit
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.node_budget = get_node_budget(node_budget, byte_budget)  # most nodes kept in memory, None for no limit
+        self.weight = weight            # weighted A*, nodes are ordered by g(n) + weight * h(n), 1 for A*
+        self.timed = timed              # time each phase of the search in the stats, see stats.py
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+        self.status = None              # the status of the last search, see result.py
+        self.stats = SearchStats()      # the counters and phase times of the last search, see stats.py
+
+        self.frontier = None            # frontier, priority queue of leaf nodes that can be expanded
+        self.frontier_type = frontier_type  # 'heap' (binary heap) or 'bucket' (bucket queue, integer costs only)
+        self.check_heuristic = check_heuristic  # debug mode, check each incremental h(n) against a full evaluation
+        self.explored_set = None        # explored set, the states that have been expanded with their best path cost
 
         self.num_nodes_expanded = 0     # the number of nodes expanded
         self.max_queue_size = 0         # the maximum size of the queue
+        self.max_frontier_size = 0      # the most nodes the frontier held at once
         self.depth = 0                  # the depth of the goal node
 
         self.node = None                # the current node the algorithm is looking at
         self.goal_state = []            # goal state of the initial state
-
-        self.tree = None                # the search tree that stores all the nodes
-        self.tree_dict = {}             # dictionary to store the tree nodes
+        self.goal_key = None            # goal state packed into one integer, see board.py
+        self.tile_bits = 4              # the number of bits used for each tile of a packed state
+        self.heuristic = None           # the heuristic tables of the algorithm choice, see heuristic.py
 
     # idea of comments below from lecture slides, 02. Blind Search
     # function GRAPH-SEARCH(problem) returns a solution, or failure
     def graph_search(self, initial_state, goal_state, operators, algorithm_choice):
 
-        print("\nBEGIN GRAPH SEARCH\n-----------------------------------------")
+        if self.verbosity >= SUMMARY:
+            print("\nBEGIN GRAPH SEARCH\n-----------------------------------------")
+
+        # the text trace of every expanded node is the default sink of a tracer
+        tracer = self.tracer
+        if tracer is None and self.verbosity >= EXPANSIONS:
+            tracer = Tracer()
+
+        # the counters of the search, and the phase timers when timed, see stats.py
+        stats = self.stats = SearchStats(self.timed)
+        timed = self.timed
+        stats.start()
+        self.frontier = None
+
+        # an unsolvable puzzle would search the whole reachable half of the state space, return failure now
+        if not is_solvable(initial_state, goal_state):
+            return self.end_search(UNSOLVABLE)
+
+        # the time the search has to stop by and the cancel event, checked every 1024 expansions
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
 
         # set up the root node with initial_state, goal_state, operators, algorithm_choice
         self.create_root_node(initial_state, goal_state, operators, algorithm_choice)
 
         # initialize the frontier using the initial state of problem
-        #   - frontier is a priority queue, but implemented as a dictionary of key : value pairs
-        #   - the key is the cost, the value is the node object
-        self.frontier[self.node.get_estimated_cost()] = [self.node]
-
-        # set up the root of the tree, add to the dictionary
-        self.tree = Tree()
-        self.tree.set_node(self.node)
-        self.tree_dict[self.node.get_estimated_cost()] = [self.tree]
+        #   - frontier is a priority queue ordered by the estimated cost, ties are broken first-in first-out
+        #   - it is indexed by the state, so a cheaper path to a state already in the frontier replaces it
+        #   - a bucket queue only holds integer priorities, so it can only be weighted by an integer
+        if self.frontier_type == "bucket" and self.weight != int(self.weight):
+            raise ValueError("the bucket frontier needs an integer weight, use the heap frontier")
+        self.frontier = create_frontier(self.frontier_type)
+        self.frontier.push(self.node.get_key(), self.get_priority(self.node), self.node)
+        self.max_frontier_size = 1
+        self.num_nodes_expanded = 0
 
         # initialize the explored set to be empty
-        self.explored_set = {}
+        self.explored_set = ClosedSet()
+
+        # viable moves of the blank square for each index, built once for each board size
+        move_table = get_move_table(len(goal_state))
 
         # loop do
         while 1:
             # if the frontier is empty then return failure (None)
             if len(self.frontier) == 0:
-                return None, None
-
-            # choose a leaf node and remove it from the frontier
-            # sort priority queue (dictionary) in ascending order by the key (estimated_cost)
-            self.frontier = dict(sorted(self.frontier.items()))
-
-            # look at the key : value in the front of the dictionary
-            cost, object_list = next(iter(self.frontier.items()))
-            # object_list.sort()
+                return self.end_search(NOT_FOUND)
 
-            # set the node to the object at the front of the list
-            self.node = object_list[0]
+            # if a limit was reached then return failure (None)
+            if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+                return self.end_search(NODE_LIMIT)
 
-            # the lowest cost is at the front, remove it from the frontier, update the dictionary
-            object_list.pop(0)
-            self.frontier[cost] = object_list
+            if (self.num_nodes_expanded & 1023) == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return self.end_search(TIMEOUT)
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    return self.end_search(CANCELLED)
 
-            # remove the estimated_cost key if no objects in the list
-            if len(object_list) == 0:
-                self.frontier.pop(cost)
+            # the nodes in memory are the frontier and the explored set, stop before they outgrow the budget
+            if self.node_budget is not None and len(self.frontier) + len(self.explored_set) > self.node_budget:
+                return self.end_search(BUDGET_EXCEEDED)
 
-            # find the corresponding node in the tree dictionary
-            if cost in self.tree_dict:
-                object_list = list(self.tree_dict.get(cost))
-                for obj in object_list:
-                    node = obj.get_node()
-                    if node == self.node:
-                        self.tree = obj
+            # choose a leaf node and remove it from the frontier, the lowest estimated cost is at the front
+            if timed:
+                start = time.perf_counter()
+            self.node = self.frontier.pop()
+            if timed:
+                start = stats.lap("pop", start)
 
             # if the node contains a goal state then return the corresponding solution
-            if self.node.get_state() == self.goal_state:
-                return self.node, self.tree
-
-            # add the node to the explored set
-            # check if the estimated_cost is a key in the explored set
-            if self.node.get_estimated_cost() in self.explored_set:
-                # get the list of objects, add the new node object, update the dictionary
-                object_list = list(self.explored_set.get(self.node.get_estimated_cost()))
-                object_list.append(self.node)
-                self.explored_set[self.node.get_estimated_cost()] = object_list
-            else:
-                # update the dictionary with the node object
-                self.explored_set[self.node.get_estimated_cost()] = [self.node]
-
-            # check if the maximum number of nodes in the explored set has increased
-            if len(self.explored_set) > self.max_queue_size:
-                self.max_queue_size = len(self.explored_set)
+            if self.node.get_key() == self.goal_key:
+                return self.end_search(SOLVED, self.node)
+            if timed:
+                start = stats.lap("goal test", start)
+
+            # add the node to the explored set, a hashed closed set keyed by the state
+            self.explored_set.add(self.node.get_key(), self.node.get_path_cost())
+            if timed:
+                start = stats.lap("duplicate check", start)
 
             # expand the chosen node, adding the resulting nodes to the frontier
             # only if not in the frontier or explored set
             #   - increase the number of nodes expanded by 1
-            operators = self.node.get_actions()
             parent = self.node
 
-            # output the node that was just expanded, increase the number of nodes expanded by 1
-            self.output_expanded_node()
+            # the move that undoes the move that created the node, it would only recreate the parent node
+            reverse_move = parent.move ^ 1
+
+            # trace the node that was just expanded, increase the number of nodes expanded by 1
+            if tracer is not None:
+                tracer(self.node, self.num_nodes_expanded)
             self.num_nodes_expanded += 1
 
-            # loop through the viable actions of the node, do that action to create a child node
+            # loop through the viable moves of the blank square in the move table, create a child node for each
             # add to frontier if not in frontier and not in explored set
-            for operator in operators:
-                child = self.create_child(parent, operator, algorithm_choice)
-
-                # get the child data, a tuple of the state and estimated cost
-                child_data = child.get_data()
-
-                # bool for if the child node is in the frontier, explored set
-                in_frontier = False
-                in_explored_set = False
-
-                # check if the estimated_cost is a key in the frontier, check if child in list of nodes
-                if child.get_estimated_cost() in self.frontier:
-                    object_list = list(self.frontier.get(child.get_estimated_cost()))
-                    for obj in object_list:
-                        node_data = obj.get_data()
-                        if node_data == child_data:
-                            in_frontier = True
-
-                # check if the estimated_cost is a key in the explored set, check if child in list of nodes
-                if child.get_estimated_cost() in self.explored_set:
-                    object_list = list(self.explored_set.get(child.get_estimated_cost()))
-                    for obj in object_list:
-                        node_data = obj.get_data()
-                        if node_data == child_data:
-                            in_explored_set = True
-
-                # child object not in frontier or explored set
-                if not in_frontier and not in_explored_set:
-
-                    # check if the estimated_cost is a key in the frontier
-                    if child.get_estimated_cost() in self.frontier:
-                        # get the list of objects, add the new node object, update the dictionary
-                        object_list = list(self.frontier.get(child.get_estimated_cost()))
-                        object_list.append(child)
-                        self.frontier[child.get_estimated_cost()] = object_list
-                    else:
-                        # update the dictionary with the node object
-                        self.frontier[child.get_estimated_cost()] = [child]
-
-                # create another tree object, set the node as the child node, the parent as the current tree node
-                subtree = Tree()
-                subtree.set_node(child)
-                subtree.set_parent(self.tree)
-
-                # add the tree object to the dictionary
-                if child.get_estimated_cost() in self.tree_dict:
-                    object_list = list(self.tree_dict.get(child.get_estimated_cost()))
-                    object_list.append(subtree)
-                    self.tree_dict[child.get_estimated_cost()] = object_list
-                else:
-                    self.tree_dict[child.get_estimated_cost()] = [subtree]
+            for target_index, move in move_table[parent.blank_index]:
+                if move == reverse_move:
+                    continue
+
+                child = self.create_child(parent, target_index, move, algorithm_choice)
+                if timed:
+                    start = stats.lap("expansion", start)
+
+                # skip the child if its state was already expanded through a path that is as cheap or cheaper
+                #   - a cheaper rediscovery re-opens the state (only possible with an inconsistent heuristic)
+                key = child.get_key()
+                if not self.explored_set.is_improvement(key, child.get_path_cost()):
+                    stats.num_duplicates += 1
+                    if timed:
+                        start = stats.lap("duplicate check", start)
+                    continue
+
+                if self.explored_set.remove(key):
+                    stats.num_reopened += 1
+                if timed:
+                    start = stats.lap("duplicate check", start)
+
+                # add the child to the frontier
+                #   - if the state is already in the frontier, the cheaper of the two is kept
+                if not self.frontier.push(key, self.get_priority(child), child):
+                    stats.num_duplicates += 1
+                if timed:
+                    start = stats.lap("push", start)
+
+            # keep the high-water marks of the frontier and the explored set
+            if len(self.frontier) > self.max_frontier_size:
+                self.max_frontier_size = len(self.frontier)
+            if len(self.explored_set) > stats.max_closed_size:
+                stats.max_closed_size = len(self.explored_set)
+
+    # end the search with a status, the goal node when it was found
+    #   - sets the depth of the goal node and stops the stats, returns the goal node or None
+    def end_search(self, status, node=None):
+        self.status = status
+        if node is not None:
+            self.depth = node.get_path_cost()
+
+        # every child node created was either pushed into the frontier or dropped as a duplicate
+        stats = self.stats
+        if self.frontier is not None:
+            stats.num_nodes_generated = self.frontier.counter - 1 + stats.num_duplicates
+        stats.num_nodes_expanded = self.num_nodes_expanded
+        stats.max_frontier_size = self.max_frontier_size
+        stats.stop(status, None if node is None else self.depth)
+        return node
+
+    # get the priority of a node in the frontier
+    #   - A* orders the nodes by f(n) = g(n) + h(n)
+    #   - weighted A* orders them by g(n) + weight * h(n), it goes deeper sooner and expands fewer nodes, the
+    #     solution costs at most weight times the optimal cost when h(n) is admissible
+    def get_priority(self, node):
+        if self.weight == 1:
+            return node.estimated_cost
+        return node.path_cost + self.weight * node.heuristic_cost
+
+    # run the graph search and return a search result
+    def solve(self, initial_state, goal_state, algorithm_choice):
+        start_time = time.perf_counter()
+        node = self.graph_search(initial_state, goal_state, None, algorithm_choice)
+
+        seconds = time.perf_counter() - start_time
+        actions = None if node is None else self.get_sequence_of_actions(node)
+        return SearchResult(self.status, actions, self.num_nodes_expanded, seconds, bound=self.weight)
 
     # set up the root node with initial_state, goal_state, operators, algorithm_choice
     def create_root_node(self, initial_state, goal_state, operators, algorithm_choice):
         self.goal_state = goal_state
 
+        # the goal state packed the same way as the node states, the goal test is one integer comparison
+        self.tile_bits = get_tile_bits(len(goal_state))
+        self.goal_key = encode_state(goal_state, self.tile_bits)
+        self.heuristic = get_heuristic(algorithm_choice, len(goal_state), goal_state)
+        if self.timed:
+            self.heuristic = TimedHeuristic(self.heuristic, self.stats)
+
         self.node = Node()
         self.node.set_data(initial_state, operators)
-        self.node.calculate_estimated_cost(algorithm_choice, 0)
-        self.node.find_operators()
+        self.node.calculate_estimated_cost(algorithm_choice, 0, tuple(goal_state))
 
-    # create children nodes based on node state and viable operators
-    def create_child(self, parent, operator, algorithm_choice):
-        # create new child node for each operator, set data, set parent node
-        # lists are mutable data structures, use .copy() to create a copy of parent.state
-        self.node = Node()
-        self.node.set_data(parent.state.copy(), ["up", "down", "left", "right"])
-
-        # number of rows and columns, index of the blank (0) square
-        num_row_col = int(sqrt(self.node.get_state_length()))
-        blank_square_index = self.node.get_blank_square_index()
-
-        # use indices and swap positions based on the operation, list[a], list[b] = list[b], list[a]
-        match operator:
-            case 'up':
-                self.node.swap_elements(blank_square_index, blank_square_index - num_row_col)
-            case 'down':
-                self.node.swap_elements(blank_square_index, blank_square_index + num_row_col)
-            case 'left':
-                self.node.swap_elements(blank_square_index, blank_square_index - 1)
-            case 'right':
-                self.node.swap_elements(blank_square_index, blank_square_index + 1)
-
-        # get the path cost of the parent node
-        path_cost, heuristic = parent.get_path_heuristic_costs()
-
-        # calculate estimated cost, find viable operators for the child node
-        self.node.calculate_estimated_cost(algorithm_choice, path_cost + 1)
-        self.node.find_operators()
+    # create a child node where the blank square of the parent node moved to the target index
+    def create_child(self, parent, target_index, move, algorithm_choice):
+        # create new child node, the tiles are swapped in the packed state and the parent is set
+        #   - the estimated cost is updated from the parent's estimated cost in O(1)
+        self.node = parent.create_child(target_index, move, self.tile_bits, self.heuristic)
+
+        # debug mode, compare with the estimated cost calculated from scratch
+        if self.check_heuristic:
+            check = Node(self.node.state, self.node.length, self.node.blank_index)
+            check.calculate_estimated_cost(algorithm_choice, self.node.path_cost, tuple(self.goal_state))
+
+            if check.heuristic_raw != self.node.heuristic_raw or check.estimated_cost != self.node.estimated_cost:
+                raise RuntimeError("incremental h(n) = {} does not match the full evaluation h(n) = {} for state {}"
+                                   .format(self.node.heuristic_cost, check.heuristic_cost, self.node.get_state()))
 
         return self.node
 
     # output the expanded node with g(n) and h(n)
     def output_expanded_node(self):
-        state = self.node.get_state()
-        num_row_col = int(sqrt(self.node.get_state_length()))
         path_cost, heuristic_cost = self.node.get_path_heuristic_costs()
-
-        # output a message depending on if the node is the start state (path_cost == 0), or not
-        if path_cost == 0:
-            print("Expanding state", end='')
-        else:
-            print("\n\nThe node to expand has g(n) = {}, h(n) = {}".format(path_cost, heuristic_cost), end='')
-
-        # loop through the state list, print it out in a NxN matrix format
-        for index, element in enumerate(state):
-            if index % num_row_col == 0:
-                print("\n", end='')
-            print(element, end=' ')
-
-        # output message if not in the start state (path_cost == 0)
-        if path_cost != 0:
-            print("\t\tExpanding this node ...")
+        write_expansion(ExpansionEvent(self.num_nodes_expanded, self.node.get_state(), path_cost, heuristic_cost,
+                                       self.node.get_estimated_cost()))
 
     # output the results after finding the goal state
     def output_results(self):
 
-        # loop through the lists of node objects in the explored set dictionary, sum them to find max queue size
-        self.max_queue_size = 0
-
-        for object_list in self.explored_set.values():
-            self.max_queue_size += len(object_list)
+        # the max queue size is the high-water mark of the frontier
+        self.max_queue_size = self.max_frontier_size
 
         print("\n\nRESULTS\n-------------------------------------")
         print("The number of nodes expanded  : {}".format(self.num_nodes_expanded))
         print("The maximum size of the queue : {}".format(self.max_queue_size))
         print("The depth of the goal node    : {}".format(self.depth))
 
+        # the time spent in each phase, only when the search was timed
+        if self.timed:
+            self.stats.output()
+
     # output the sequence of actions to get from the initial state to the goal state
-    def output_sequence_of_actions(self, tree):
+    def output_sequence_of_actions(self, node):
         print("\n\nSEQUENCE OF ACTIONS\n-------------------------------------")
 
-        node = tree.get_node()
-        num_row_col = int(sqrt(len(node.get_state())))
-
-        # initial value of the sequence is the state of the goal node
-        sequence = [node.get_state()]
-        parent = tree.get_parent()
+        for action in self.get_sequence_of_actions(node):
+            print(action)
 
-        # go to the parent node and save the state, stop when at the start state who has a parent 'None'
-        while parent is not None:
-            node = parent.get_node()
-            sequence.append(node.get_state())
-            parent = parent.get_parent()
-
-        # we added node states in the order of goal -> ... -> start, reverse this list to now have start -> ... -> goal
-        sequence.reverse()
+    # get the sequence of actions to get from the initial state to the goal node (e.g. ["move up", "move left"])
+    def get_sequence_of_actions(self, node):
+        actions = get_sequence_of_actions(node)
 
         # the depth of our graph search is how many actions it took to get from the start node to end node
-        # need to subtract 1 as the start node is depth = 0
-        self.depth = len(sequence) - 1
-
-        # loop through the sequence, a list of lists, each list is the state of a node (e.g. [1,2,3,4,5,6,7,0,8])
-        # compare each state to the subsequent state to see if the blank square moved up, down, left, or right
-        # the sequence[:-1] means we don't look at the last element of the list
-        for index, action in enumerate(sequence[:-1]):
-            # store the index of the blank square (0) for the current state
-            blank_square_index = action.index(0)
-
-            # look at the next state in the sequence, find the index of the blank square (0)
-            action_next = sequence[index + 1]
-            blank_square_index_next = action_next.index(0)
-
-            # hold the difference between the indexes of the blank squares
-            difference = blank_square_index_next - blank_square_index
-
-            # we have an NxN matrix with the following indices
-            #
-            #    3x3         4x4                5x5
-            #   0 1 2     0 1  2  3        0  1  2  3  4
-            #   3 4 5     4 5  6  7        5  6  7  8  9
-            #   6 7 8     8 9 10 11       10 11 12 13 14
-            #
-            # how to determine which direction (up, down, left, or right) the blank square (0) moved
-            #   - up:    blank_square_index_next - blank_square_index = -num_row_col
-            #   - down:  blank_square_index_next - blank_square_index = num_row_col
-            #   - left:  blank_square_index_next - blank_square_index = -1
-            #   - right: blank_square_index_next - blank_square_index = 1
-
-            if difference == -num_row_col:
-                print("move up")
-            elif difference == num_row_col:
-                print("move down")
-            elif difference == -1:
-                print("move left")
-            elif difference == 1:
-                print("move right")
+        self.depth = len(actions)
+
+        return actions
 
     # # idea of comments below from reading material 2, general-search-and-uniform-cost-search
     # # function CHILD-NODE(problem, parent, action) returns a node
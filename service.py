@@ -0,0 +1,329 @@
+"""
+
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import get_move_table, parse_board
+from heuristic import get_default_goal_state
+from result import INVALID, SearchResult
+from solver import ENGINES, get_algorithm_choice, solve
+
+
+# the engines the service can run, sma needs a memory budget and hda starts processes of its own, which a worker of
+# the pool cannot
+SERVICE_ENGINES = tuple(engine for engine in ENGINES if engine not in ("sma", "hda"))
+
+
+# solve one board in a worker process, the search stops when the cancel event is set
+def solve_request(board, algorithm, heuristic, time_limit, cancel_event):
+    return solve(board, algorithm, heuristic, time_limit=time_limit, cancel_event=cancel_event)
+
+
+class Job:
+
+    # one search in the worker pool, shared by every request for the same board
+    def __init__(self, future, cancel_event):
+        self.future = future            # the asyncio future of the search result
+        self.cancel_event = cancel_event  # set to stop the search, a manager Event the worker can see
+        self.waiters = 0                # the number of requests waiting for the result
+
+
+class SolverService:
+
+    # solve boards from asyncio code, the searches run in a pool of worker processes so the event loop never blocks
+    #   - requests for a board that is already being searched wait for that search, they are coalesced
+    #   - a request that times out or is cancelled (e.g. its client disconnected) stops waiting, and the search is
+    #     cancelled when no request waits for it any more, the search checks its cancel event every 1024 expansions
+    #     (bfs between layers)
+    #   - the oracle engine answers 3x3 boards from its distance table without a search, it needs no cancelling
+    #   - use it as an async context manager, or call start and close
+    def __init__(self, workers=None, algorithm="astar", heuristic="manhattan", time_limit=None):
+        get_algorithm_choice(heuristic)
+        if algorithm not in SERVICE_ENGINES:
+            raise ValueError("the service cannot run the {} engine, use one of {}".format(
+                algorithm, ", ".join(SERVICE_ENGINES)))
+        self.workers = workers          # the number of worker processes, None for one per core
+        self.algorithm = algorithm      # the search engine, one of SERVICE_ENGINES
+        self.heuristic = heuristic      # the heuristic, see solver.HEURISTIC_NAMES
+        self.time_limit = time_limit    # seconds allowed for each search, None for no limit
+
+        self.executor = None            # the pool of worker processes
+        self.manager = None             # the manager process that holds the cancel events
+        self.jobs = {}                  # board tuple -> the job of the search in progress
+
+        self.num_requests = 0           # the number of requests
+        self.num_searches = 0           # the number of searches started, the other requests were coalesced
+        self.num_cancelled = 0          # the number of searches cancelled
+        self.num_timeouts = 0           # the number of requests that timed out
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # start the worker pool and the manager of the cancel events
+    #   - the processes are spawned, a forked worker would inherit the sockets of the server and keep a connection
+    #     open after its client closed it
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.manager = context.Manager()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    # cancel the searches in progress and stop the worker processes
+    async def close(self):
+        for job in self.jobs.values():
+            job.cancel_event.set()
+        self.jobs = {}
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown)
+        self.manager.shutdown()
+
+    # solve a board, returns a search result, see result.py
+    #   - timeout is the seconds this request waits, None to wait for the search, asyncio.TimeoutError is raised
+    #     when it runs out, the search goes on as long as another request waits for it
+    async def solve(self, board, timeout=None):
+        self.num_requests += 1
+        key = tuple(board)
+        job = self.jobs.get(key)
+        if job is None:
+            job = self.start_job(key)
+
+        job.waiters += 1
+        try:
+            # shield the shared search from the cancellation of this one request
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            self.num_timeouts += 1
+            raise
+        finally:
+            job.waiters -= 1
+            if job.waiters == 0 and not job.future.done():
+                self.cancel_job(key, job)
+
+    # start the search of a board in the worker pool
+    def start_job(self, key):
+        loop = asyncio.get_running_loop()
+        cancel_event = self.manager.Event()
+        future = loop.run_in_executor(self.executor, solve_request, list(key), self.algorithm, self.heuristic,
+                                      self.time_limit, cancel_event)
+        job = self.jobs[key] = Job(future, cancel_event)
+        self.num_searches += 1
+
+        # the job is forgotten as soon as its search ends, a later request starts a new search
+        future.add_done_callback(lambda done: self.jobs.pop(key, None) if self.jobs.get(key) is job else None)
+        return job
+
+    # cancel a search no request waits for, a search still in the queue of the pool never starts
+    def cancel_job(self, key, job):
+        job.cancel_event.set()
+        job.future.cancel()
+        if self.jobs.get(key) is job:
+            del self.jobs[key]
+        self.num_cancelled += 1
+
+    # get the counters of the service
+    def get_stats(self):
+        return {
+            "requests": self.num_requests,
+            "searches": self.num_searches,
+            "coalesced": self.num_requests - self.num_searches,
+            "cancelled": self.num_cancelled,
+            "timeouts": self.num_timeouts,
+        }
+
+
+# serve a connection, one request per line and one JSON response per line
+#   - a request is a board (see board.parse_board) or a JSON object with a "board" list and an optional "id"
+#   - the requests of a connection are solved concurrently, each response has the id of its request (the line
+#     number when it has none), so responses can come back out of order
+#   - when the client disconnects (or closes its side), the requests it was waiting for are cancelled
+async def serve_connection(service, reader, writer, timeout=None):
+    tasks = set()
+
+    # write a response, a client that has gone away is not an error, its other requests are cancelled on EOF
+    async def write_response(request_id, response):
+        try:
+            writer.write((json.dumps(dict(id=request_id, **response)) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def respond(request_id, board):
+        try:
+            result = await service.solve(board, timeout)
+            response = result.to_dict()
+        except asyncio.TimeoutError:
+            response = {"status": "timeout", "message": "the request timed out"}
+        await write_response(request_id, response)
+
+    line_number = 0
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            line_number += 1
+            request_id, board = parse_request(line.decode(), line_number)
+            if board is None:
+                await write_response(request_id, SearchResult(INVALID, message="The request is not a board.").to_dict())
+                continue
+
+            task = asyncio.create_task(respond(request_id, board))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except ConnectionError:
+        pass
+    finally:
+        for task in list(tasks):
+            task.cancel()
+        writer.close()
+
+
+# parse a request line, returns (id, board), the board is None when the line is not a valid board
+def parse_request(line, line_number):
+    line = line.strip()
+    try:
+        if line.startswith("{"):
+            data = json.loads(line)
+            return data.get("id", line_number), validate_board(data["board"])
+        return line_number, validate_board(parse_board(line))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return line_number, None
+
+
+# check that a board is a list of numbers, the search validates the board itself
+def validate_board(board):
+    return [int(tile) for tile in board]
+
+
+# start the server of a service, returns the asyncio server
+async def start_server(service, host="127.0.0.1", port=8765, timeout=None):
+    return await asyncio.start_server(lambda reader, writer: serve_connection(service, reader, writer, timeout),
+                                      host, port)
+
+
+# make random boards by walking the blank square away from the goal state
+def make_boards(size, count, moves, seed):
+    length = size * size
+    move_table = get_move_table(length)
+    rng = random.Random(seed)
+    boards = []
+
+    for _ in range(count):
+        board = list(get_default_goal_state(length))
+        blank_index = board.index(0)
+        for _ in range(moves):
+            target_index, move = rng.choice(move_table[blank_index])
+            board[blank_index], board[target_index] = board[target_index], 0
+            blank_index = target_index
+        boards.append(board)
+
+    return boards
+
+
+# the load generator, clients that each send requests one at a time over their own connection
+#   - returns the latency of every request in seconds
+async def generate_load(host, port, boards, num_requests, num_clients, seed):
+    rng = random.Random(seed)
+    requests = [rng.choice(boards) for _ in range(num_requests)]
+    latencies = []
+
+    async def client(number):
+        reader, writer = await asyncio.open_connection(host, port)
+        for index in range(number, num_requests, num_clients):
+            start_time = time.perf_counter()
+            writer.write((" ".join(str(tile) for tile in requests[index]) + "\n").encode())
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start_time)
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client(number) for number in range(num_clients)))
+    return latencies
+
+
+# get a percentile of sorted values, nearest rank
+def get_percentile(values, percent):
+    return values[min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))]
+
+
+# run the load generator against a server in this process and report latency and throughput
+async def run_benchmark(args):
+    boards = make_boards(args.size, args.distinct, args.moves, args.seed)
+
+    async with SolverService(args.workers, args.algorithm, args.heuristic) as service:
+        server = await start_server(service, "127.0.0.1", 0, args.timeout)
+        port = server.sockets[0].getsockname()[1]
+
+        start_time = time.perf_counter()
+        latencies = await generate_load("127.0.0.1", port, boards, args.requests, args.clients, args.seed)
+        seconds = time.perf_counter() - start_time
+
+        server.close()
+        await server.wait_closed()
+        stats = service.get_stats()
+
+    latencies.sort()
+    print("{:,} requests over {} clients in {:.3f} s, {:,.1f} requests/s".format(
+        len(latencies), args.clients, seconds, len(latencies) / seconds))
+    print("latency p50 {:.2f} ms  p99 {:.2f} ms  max {:.2f} ms".format(
+        get_percentile(latencies, 50) * 1000, get_percentile(latencies, 99) * 1000, latencies[-1] * 1000))
+    print("searches {searches:,}  coalesced {coalesced:,}  cancelled {cancelled:,}  timeouts {timeouts:,}"
+          .format(**stats))
+
+
+# serve until interrupted
+async def serve_forever(args):
+    async with SolverService(args.workers, args.algorithm, args.heuristic) as service:
+        server = await start_server(service, args.host, args.port, args.timeout)
+        print("serving on {}:{}".format(args.host, args.port))
+        async with server:
+            await server.serve_forever()
+
+
+# command line
+#   - python service.py serve [--port 8765], one board per line in, one JSON result per line out
+#   - python service.py bench [--requests 1000] [--clients 32] [--distinct 100], a server in this process driven
+#     by the load generator, reports p50 and p99 latency and throughput
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve boards as an asyncio service.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="serve requests over TCP")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on (default 8765)")
+
+    bench_parser = subparsers.add_parser("bench", help="benchmark a server in this process")
+    bench_parser.add_argument("--requests", type=int, default=1000, help="number of requests (default 1000)")
+    bench_parser.add_argument("--clients", type=int, default=32, help="concurrent clients (default 32)")
+    bench_parser.add_argument("--distinct", type=int, default=100, help="distinct boards (default 100)")
+    bench_parser.add_argument("--size", type=int, default=3, help="number of rows and columns (default 3)")
+    bench_parser.add_argument("--moves", type=int, default=40, help="random moves away from the goal (default 40)")
+    bench_parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+
+    for subparser in (serve_parser, bench_parser):
+        subparser.add_argument("--workers", type=int, help="number of worker processes (default one per core)")
+        subparser.add_argument("--algorithm", choices=SERVICE_ENGINES, default="astar",
+                               help="search engine, oracle answers 3x3 boards with no search (default astar)")
+        subparser.add_argument("--heuristic", default="manhattan", help="heuristic (default manhattan)")
+        subparser.add_argument("--timeout", type=float, help="seconds a request waits for its result")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve_forever(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run_benchmark(args))
@@ -0,0 +1,255 @@
+"""
+
+"""
+
+import heapq
+import time
+
+from board import encode_state, get_move_table, get_tile_bits, is_solvable
+from heuristic import get_heuristic
+from node import Node, get_node_budget, get_sequence_of_actions
+from result import BUDGET_EXCEEDED, CANCELLED, NODE_LIMIT, NOT_FOUND, SOLVED, TIMEOUT, UNSOLVABLE, SearchResult
+
+
+INFINITY = float("inf")
+
+
+class MemoryNode:
+
+    # slots keep every node a small fixed-size record, there is no per-node __dict__
+    __slots__ = ("node", "parent", "children", "depth", "estimated_cost", "forgotten_cost", "in_memory", "version")
+
+    # a node of the search tree in memory, the board node with the bookkeeping of SMA*
+    def __init__(self, node, parent=None, estimated_cost=None):
+        self.node = node                # the board node, see node.py
+        self.parent = parent            # the parent in memory, None for the root
+        self.children = []              # the children in memory
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.estimated_cost = node.get_estimated_cost() if estimated_cost is None else estimated_cost  # f(n)
+        self.forgotten_cost = INFINITY  # the lowest f(n) of the children that were dropped
+        self.in_memory = True           # False once the node is dropped
+        self.version = 0                # changes each time the node is queued again, older heap entries are stale
+
+    # get the priority of the node in the open queue, None if it has nothing to expand
+    #   - a leaf is expanded by its f(n), a node with dropped children by the lowest f(n) of those children
+    def get_open_cost(self):
+        if not self.children:
+            return self.estimated_cost
+        if self.forgotten_cost < INFINITY:
+            return self.forgotten_cost
+        return None
+
+
+class MemoryBoundedSearch:
+
+    def __init__(self, node_budget=None, byte_budget=None, node_limit=None, time_limit=None, cancel_event=None):
+        self.node_budget = get_node_budget(node_budget, byte_budget)  # most nodes kept in memory
+        self.node_limit = node_limit    # stop after this many nodes are expanded, None for no limit
+        self.time_limit = time_limit    # stop after this many seconds, None for no limit
+        self.cancel_event = cancel_event  # stop when this event is set, e.g. a multiprocessing Event, None for never
+        if self.node_budget is None or self.node_budget < 5:
+            raise ValueError("the memory-bounded search needs a budget of at least 5 nodes")
+
+        self.status = None              # the status of the last search, see result.py
+        self.num_nodes_expanded = 0     # the number of nodes expanded, a dropped node can be expanded again
+        self.num_nodes_dropped = 0      # the number of leaves dropped to stay in the budget
+        self.max_nodes_stored = 0       # the most nodes in memory at once
+        self.depth = 0                  # the depth of the goal node
+
+        self.num_nodes_stored = 0       # the nodes in memory
+        self.open = []                  # heap of (open cost, -depth, order, version, node), the best node first
+        self.leaves = []                # heap of (-f(n), depth, order, version, node), the worst leaf first
+        self.order = 0                  # insertion counter, keeps heap entries comparable
+        self.cut = False                # True when a path was cut because the budget could not hold it
+
+    # simplified memory-bounded A* (SMA*, Russell 1992)
+    #   - a best-first tree search that keeps at most node_budget nodes, with pathmax f(n) = max(f(parent), g + h)
+    #   - when memory is full, the worst leaf (highest f(n), shallowest on ties) is dropped and its f(n) is kept
+    #     by its parent, the parent is queued again by that f(n) and regenerates the dropped children when it is
+    #     the best node, so a subtree is only searched again when it looks best
+    #   - f(n) of a node is backed up to the lowest f(n) below it, a node never looks better than its subtree
+    #   - the solution is optimal when the budget can hold the optimal path, otherwise the search fails with
+    #     the budget exceeded status instead of running out of memory
+    #   - the node limit is checked before each expansion, the time limit and the cancel event every 1024 expansions
+    #   - returns the goal node, or None if there is no solution within the budget
+    def search(self, initial_state, goal_state, algorithm_choice):
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.num_nodes_expanded = 0
+        self.num_nodes_dropped = 0
+        self.num_nodes_stored = 0
+        self.max_nodes_stored = 0
+        self.open = []
+        self.leaves = []
+        self.cut = False
+
+        if not is_solvable(initial_state, goal_state):
+            self.status = UNSOLVABLE
+            return None
+
+        length = len(goal_state)
+        bits = get_tile_bits(length)
+        goal_key = encode_state(goal_state, bits)
+        heuristic = get_heuristic(algorithm_choice, length, goal_state)
+        move_table = get_move_table(length)
+
+        node = Node()
+        node.set_data(list(initial_state))
+        node.calculate_estimated_cost(algorithm_choice, 0, tuple(goal_state))
+        root = MemoryNode(node)
+        self.num_nodes_stored = self.max_nodes_stored = 1
+        self.queue(root)
+
+        while True:
+            best = self.peek_open()
+
+            # every node left is a dead end or was cut by the budget
+            if best is None or best.get_open_cost() == INFINITY:
+                self.status = BUDGET_EXCEEDED if self.cut else NOT_FOUND
+                return None
+
+            # every step costs 1, a solution needs at least f(n) + 1 nodes on its path
+            if best.get_open_cost() >= self.node_budget:
+                self.status = BUDGET_EXCEEDED
+                return None
+
+            if not best.children and best.node.get_key() == goal_key:
+                self.status = SOLVED
+                self.depth = best.depth
+                return best.node
+
+            if self.node_limit is not None and self.num_nodes_expanded >= self.node_limit:
+                self.status = NODE_LIMIT
+                return None
+            if (self.num_nodes_expanded & 1023) == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    self.status = TIMEOUT
+                    return None
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.status = CANCELLED
+                    return None
+
+            self.expand(best, move_table, bits, heuristic)
+
+            # stay in the budget, the best node is never dropped
+            while self.num_nodes_stored > self.node_budget and self.drop_worst_leaf():
+                pass
+
+    # expand a node, every child that is not in memory is generated
+    #   - a child whose state is already on the path is skipped, it would be a cycle
+    #   - a child that could not be stored with its whole path is given f(n) = infinity
+    def expand(self, parent, move_table, bits, heuristic):
+        self.num_nodes_expanded += 1
+        node = parent.node
+
+        # the states on the path and the children already in memory
+        skip = {child.node.get_key() for child in parent.children}
+        ancestor = parent
+        while ancestor is not None:
+            skip.add(ancestor.node.get_key())
+            ancestor = ancestor.parent
+
+        new_children = []
+        for target_index, move in move_table[node.blank_index]:
+            if move == node.move ^ 1:
+                continue
+
+            child = node.create_child(target_index, move, bits, heuristic)
+            if child.get_key() in skip:
+                continue
+
+            if parent.depth + 2 > self.node_budget:
+                estimated_cost = INFINITY
+                self.cut = True
+            else:
+                estimated_cost = max(parent.estimated_cost, child.get_estimated_cost())
+
+            new_children.append(MemoryNode(child, parent, estimated_cost))
+
+        parent.forgotten_cost = INFINITY
+        if not new_children and not parent.children:
+            # a dead end, it stays a leaf until it is dropped
+            parent.estimated_cost = INFINITY
+            self.queue(parent)
+            self.back_up(parent.parent)
+            return
+
+        parent.children.extend(new_children)
+        self.num_nodes_stored += len(new_children)
+        if self.num_nodes_stored > self.max_nodes_stored:
+            self.max_nodes_stored = self.num_nodes_stored
+
+        self.queue(parent)
+        for child in new_children:
+            self.queue(child)
+        self.back_up(parent)
+
+    # raise f(n) of a node and its ancestors to the lowest f(n) below them
+    def back_up(self, node):
+        while node is not None and node.children:
+            lowest = min(min(child.estimated_cost for child in node.children), node.forgotten_cost)
+            if lowest <= node.estimated_cost:
+                return
+            node.estimated_cost = lowest
+            node = node.parent
+
+    # drop the worst leaf, its f(n) is remembered by its parent and the parent is queued by it
+    #   - returns False when the worst leaf is the root or the best node, it cannot be dropped
+    def drop_worst_leaf(self):
+        leaf = self.peek_leaves()
+        if leaf is None or leaf.parent is None or leaf is self.peek_open():
+            return False
+
+        parent = leaf.parent
+        parent.children.remove(leaf)
+        leaf.in_memory = False
+        self.num_nodes_stored -= 1
+        self.num_nodes_dropped += 1
+
+        if leaf.estimated_cost < parent.forgotten_cost:
+            parent.forgotten_cost = leaf.estimated_cost
+        if not parent.children:
+            parent.estimated_cost = max(parent.estimated_cost, parent.forgotten_cost)
+            parent.forgotten_cost = INFINITY
+
+        self.queue(parent)
+        return True
+
+    # queue a node again after a change, the old heap entries of the node become stale
+    #   - a node is open while it has something to expand, and a leaf while it has no children
+    def queue(self, node):
+        node.version += 1
+        self.order += 1
+
+        open_cost = node.get_open_cost()
+        if open_cost is not None:
+            heapq.heappush(self.open, (open_cost, -node.depth, self.order, node.version, node))
+        if not node.children:
+            heapq.heappush(self.leaves, (-node.estimated_cost, node.depth, self.order, node.version, node))
+
+    # get the open node with the lowest cost, the deepest on ties, None if there is no open node
+    def peek_open(self):
+        return self.peek(self.open)
+
+    # get the leaf with the highest f(n), the shallowest on ties, None if there is no leaf
+    def peek_leaves(self):
+        return self.peek(self.leaves)
+
+    # get the first entry of a heap that is not stale, stale entries are dropped
+    @staticmethod
+    def peek(heap):
+        while heap:
+            entry = heap[0]
+            node = entry[4]
+            if node.in_memory and node.version == entry[3]:
+                return node
+            heapq.heappop(heap)
+        return None
+
+    # run the search and return a search result
+    def solve(self, initial_state, goal_state, algorithm_choice):
+        start_time = time.perf_counter()
+        node = self.search(initial_state, goal_state, algorithm_choice)
+
+        seconds = time.perf_counter() - start_time
+        actions = None if node is None else get_sequence_of_actions(node)
+        return SearchResult(self.status, actions, self.num_nodes_expanded, seconds)
@@ -0,0 +1,228 @@
+"""
+
+"""
+
+import sys
+import time
+
+from board import get_state_error, is_solvable, parse_board, read_board_lines
+from heuristic import GOAL_LAYOUTS, HEURISTICS, get_default_goal_state, get_heuristic, parse_goal_state
+from result import INVALID, NOT_FOUND, SOLVED, UNSOLVABLE, SearchResult
+
+
+# the search engines, each module is only imported when its engine is used
+ENGINES = ("astar", "weighted", "ida", "bidirectional", "ara", "sma", "hda", "bfs", "oracle")
+
+# the limits an engine cannot keep, hda workers count their expansions apart, the oracle answers at once and keeps
+# every limit
+UNSUPPORTED_LIMITS = {
+    "hda": ("node_limit",),
+}
+
+# the heuristics by name, the values are the algorithm choices of the interactive menu
+HEURISTIC_NAMES = {
+    "uniform": '1',
+    "misplaced": '2',
+    "euclidean": '3',
+    "manhattan": '4',
+    "pdb": '5',
+    "linear-conflict": '6',
+    "walking-distance": '7',
+}
+
+
+# get the algorithm choice of a heuristic, a name of HEURISTIC_NAMES or a choice of the interactive menu
+def get_algorithm_choice(heuristic):
+    choice = HEURISTIC_NAMES.get(heuristic, heuristic)
+    if choice not in HEURISTICS:
+        raise ValueError("unknown heuristic {!r}, use one of {} or 1 to {}".format(
+            heuristic, ", ".join(HEURISTIC_NAMES), len(HEURISTICS)))
+    return choice
+
+
+# solve a board without asking the user anything
+#   - board is a list of tiles in row order, 0 for the blank square
+#   - goal is the goal state, a list of the same tiles or a layout name (see heuristic.GOAL_LAYOUTS), None for the
+#     sorted tiles with the blank square last
+#   - algorithm is one of ENGINES, heuristic a name of HEURISTIC_NAMES or a choice of the interactive menu
+#   - time_limit (seconds), node_limit and cancel_event (stops the search when it is set) are kept by every
+#     engine but hda, which has no node limit, see UNSUPPORTED_LIMITS, a limit an engine cannot keep raises ValueError
+#   - byte_budget is the memory of the stored nodes (needed by sma), weight is for weighted A*, workers for hda
+#   - oracle solves 3x3 (and smaller) boards with no search, from a table of the exact distances of every state, the
+#     table is built the first time a goal state is used, see oracle.py
+#   - the board is validated once, an invalid or unsolvable board gets a result with a message and no search, so
+#     does a heuristic that cannot be built for the board (no walking distance over 4x4, a missing pattern database)
+#   - returns a search result, see result.py
+def solve(board, algorithm="astar", heuristic="manhattan", time_limit=None, node_limit=None, byte_budget=None,
+          weight=2, workers=None, cancel_event=None, goal=None):
+    if algorithm not in ENGINES:
+        raise ValueError("unknown algorithm {!r}, use one of {}".format(algorithm, ", ".join(ENGINES)))
+    algorithm_choice = get_algorithm_choice(heuristic)
+    limits = {"time_limit": time_limit, "node_limit": node_limit, "cancel_event": cancel_event}
+    for name in UNSUPPORTED_LIMITS.get(algorithm, ()):
+        if limits[name] is not None:
+            raise ValueError("the {} engine does not take a {}".format(algorithm, name.replace("_", " ")))
+
+    board = list(board)
+    message = get_state_error(board)
+    if message is not None:
+        return SearchResult(INVALID, message=message)
+
+    try:
+        if goal is None:
+            goal = get_default_goal_state(len(board))
+        elif isinstance(goal, str):
+            goal = parse_goal_state(goal, len(board))
+        goal = [int(tile) for tile in goal]
+    except (ValueError, TypeError):
+        goal = None
+    if goal is None or sorted(goal) != sorted(board):
+        return SearchResult(INVALID, message="The goal state must hold the same numbers as the board.")
+
+    if not is_solvable(board, goal):
+        return SearchResult(UNSOLVABLE, message="The puzzle is unsolvable, the goal state cannot be reached.")
+
+    # the tables are cached, the engine gets the ones built here, bfs and oracle do not use a heuristic
+    if algorithm not in ("bfs", "oracle"):
+        try:
+            get_heuristic(algorithm_choice, len(board), goal)
+        except (OSError, ValueError) as error:
+            return SearchResult(INVALID, message="The {} heuristic cannot be used: {}".format(heuristic, error))
+
+    return run_engine(algorithm, board, goal, algorithm_choice, time_limit, node_limit, byte_budget, weight,
+                      workers, cancel_event)
+
+
+# run the search of an engine, only its module is imported, so only the tables it needs are loaded
+def run_engine(algorithm, board, goal, algorithm_choice, time_limit, node_limit, byte_budget, weight, workers,
+               cancel_event):
+    match algorithm:
+        case "astar" | "weighted":
+            from search_algorithm import SearchAlgorithm
+            search = SearchAlgorithm(node_limit=node_limit, time_limit=time_limit, byte_budget=byte_budget,
+                                     weight=weight if algorithm == "weighted" else 1, cancel_event=cancel_event)
+            return search.solve(board, goal, algorithm_choice)
+        case "ara":
+            from ara_star import AnytimeSearch
+            search = AnytimeSearch(time_limit=time_limit, node_limit=node_limit, cancel_event=cancel_event)
+            return search.solve(board, goal, algorithm_choice)
+        case "sma":
+            from sma_star import MemoryBoundedSearch
+            search = MemoryBoundedSearch(byte_budget=byte_budget, node_limit=node_limit, time_limit=time_limit,
+                                         cancel_event=cancel_event)
+            return search.solve(board, goal, algorithm_choice)
+        case "hda":
+            from hda_star import ParallelSearch
+            return ParallelSearch(workers, time_limit, cancel_event).solve(board, goal, algorithm_choice)
+        case "bfs":
+            from external_bfs import ExternalSearch
+            search = ExternalSearch(node_limit=node_limit, time_limit=time_limit, cancel_event=cancel_event)
+            return search.solve(board, goal, algorithm_choice)
+        case "oracle":
+            from oracle import MAX_LENGTH, solve_with_oracle
+            if len(board) > MAX_LENGTH:
+                return SearchResult(INVALID, message="The oracle only solves boards up to 3x3.")
+            start_time = time.perf_counter()
+            actions = solve_with_oracle(board, goal)
+            status = NOT_FOUND if actions is None else SOLVED
+            return SearchResult(status, actions, 0, time.perf_counter() - start_time)
+        case "ida":
+            from ida_star import IterativeDeepeningSearch
+            search = IterativeDeepeningSearch(None, time_limit, node_limit, cancel_event)
+        case _:
+            from bidirectional import BidirectionalSearch
+            search = BidirectionalSearch(time_limit, node_limit, cancel_event)
+
+    # the search of these engines returns the actions
+    start_time = time.perf_counter()
+    actions = search.search(board, goal, algorithm_choice)
+    return SearchResult(search.status, actions, search.num_nodes_expanded, time.perf_counter() - start_time)
+
+
+# get the boards of the command line, each argument is a board, or every argument is one tile of one board
+#   - yields (id, board) pairs, the id is the number of the board
+def get_argument_boards(arguments):
+    if all(argument.isdigit() for argument in arguments):
+        arguments = [" ".join(arguments)]
+    for number, argument in enumerate(arguments, 1):
+        yield number, parse_board(argument)
+
+
+# output the result of a board, one JSON line, or a line of text with the sequence of actions
+def output_result(job_id, result, as_json):
+    if as_json:
+        import json
+        print(json.dumps(dict(id=job_id, **result.to_dict())), flush=True)
+        return
+
+    if result.is_solved():
+        text = "{} moves: {}".format(result.depth, ", ".join(result.actions) or "none")
+    else:
+        text = result.message or result.status
+    print("{}: {}".format(job_id, text), flush=True)
+
+
+# command line, python solver.py [BOARD ...] [--file FILE] [--algorithm astar] [--heuristic manhattan] [--json]
+#   - boards come from the arguments, from a file, or from standard input when there are neither, one board per
+#     line, and each result is written as soon as its board is solved
+#   - returns the exit code, 1 if a board was invalid
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve sliding puzzles without the interactive menu.")
+    parser.add_argument("boards", nargs="*",
+                        help="boards, e.g. \"1 2 3 4 5 6 7 0 8\", or the tiles of one board as separate arguments")
+    parser.add_argument("--file", help="file with one board per line, numbers or JSON, '-' for standard input")
+    parser.add_argument("--algorithm", choices=ENGINES, default="astar", help="search engine (default astar)")
+    parser.add_argument("--heuristic", default="manhattan",
+                        help="{} or 1 to {} as in the interactive menu (default manhattan)".format(
+                            ", ".join(HEURISTIC_NAMES), len(HEURISTICS)))
+    parser.add_argument("--goal", help="goal state, a layout ({}) or the tiles of the goal state (default: sorted "
+                                       "tiles, blank square last)".format(", ".join(GOAL_LAYOUTS)))
+    parser.add_argument("--weight", type=float, default=2, help="weight of weighted A* (default 2)")
+    parser.add_argument("--time-limit", type=float, help="seconds allowed for each board")
+    parser.add_argument("--node-limit", type=int, help="nodes expanded allowed for each board")
+    parser.add_argument("--memory-budget", type=float, help="megabytes of stored nodes allowed for each board")
+    parser.add_argument("--workers", type=int, help="number of worker processes of hda")
+    parser.add_argument("--json", action="store_true", help="write one JSON result per line")
+    args = parser.parse_args(argv)
+
+    try:
+        get_algorithm_choice(args.heuristic)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.algorithm == "sma" and args.memory_budget is None:
+        parser.error("the sma algorithm needs --memory-budget")
+    if args.node_limit is not None and "node_limit" in UNSUPPORTED_LIMITS.get(args.algorithm, ()):
+        parser.error("the {} algorithm does not take --node-limit".format(args.algorithm))
+    byte_budget = None if args.memory_budget is None else int(args.memory_budget * 2 ** 20)
+
+    file = None
+    if args.boards:
+        try:
+            boards = list(get_argument_boards(args.boards))
+        except ValueError:
+            parser.error("a board is numbers separated by spaces or commas")
+    elif args.file is None or args.file == "-":
+        boards = read_board_lines(sys.stdin)
+    else:
+        file = open(args.file)
+        boards = read_board_lines(file)
+
+    exit_code = 0
+    try:
+        for job_id, board in boards:
+            result = solve(board, args.algorithm, args.heuristic, args.time_limit, args.node_limit, byte_budget,
+                           args.weight, args.workers, goal=args.goal)
+            if result.status == INVALID:
+                exit_code = 1
+            output_result(job_id, result, args.json)
+    finally:
+        if file is not None:
+            file.close()
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
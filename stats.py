@@ -0,0 +1,188 @@
+"""
+
+"""
+
+import resource
+import time
+
+
+# the phases of the graph search that are timed, in the order of the loop
+#   - expansion is the creation of the child nodes, without the heuristic, which is timed on its own
+PHASES = ("pop", "goal test", "expansion", "heuristic", "duplicate check", "push")
+
+
+class SearchStats:
+
+    # the counters of one search, and the time spent in each phase of its loop when timed is True
+    #   - the counters cost a few additions for each node and are always kept, the timers read the clock several
+    #     times for each node and slow the search down, so they are off unless asked for
+    def __init__(self, timed=False):
+        self.timed = timed              # True to time each phase of the search
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)  # phase -> seconds spent in it, see PHASES
+
+        self.num_nodes_generated = 0    # child nodes created
+        self.num_nodes_expanded = 0     # nodes taken from the frontier and expanded
+        self.num_duplicates = 0         # child nodes dropped, their state was reached as cheaply before
+        self.num_reopened = 0           # expanded states reached again through a cheaper path
+        self.max_frontier_size = 0      # the most nodes the frontier held at once
+        self.max_closed_size = 0        # the most states the explored set held at once
+
+        self.status = None              # the status of the search, see result.py
+        self.depth = None               # the depth of the goal node, None if it was not found
+        self.seconds = 0.0              # the time the search took
+        self.peak_rss = 0               # the peak resident memory of the process in bytes
+        self.start_time = None
+
+    # start the clock of the search
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    # stop the clock and read the peak memory of the process
+    def stop(self, status, depth=None):
+        self.seconds = time.perf_counter() - self.start_time
+        self.status = status
+        self.depth = depth
+        self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    # add the time since start to a phase, returns the time now, the start of the next phase
+    def lap(self, phase, start):
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - start
+        return now
+
+    # get the number of nodes expanded per second
+    def get_nodes_per_second(self):
+        return self.num_nodes_expanded / self.seconds if self.seconds > 0 else 0.0
+
+    # get the stats as a dictionary, e.g. for writing it as JSON
+    #   - the phase times are only there when the search was timed
+    def to_dict(self):
+        stats = {
+            "status": self.status,
+            "depth": self.depth,
+            "nodes_generated": self.num_nodes_generated,
+            "nodes_expanded": self.num_nodes_expanded,
+            "duplicates": self.num_duplicates,
+            "reopened": self.num_reopened,
+            "max_frontier_size": self.max_frontier_size,
+            "max_closed_size": self.max_closed_size,
+            "seconds": round(self.seconds, 6),
+            "nodes_per_second": round(self.get_nodes_per_second(), 1),
+            "peak_rss": self.peak_rss,
+        }
+        if self.timed:
+            stats["phase_seconds"] = {phase: round(seconds, 6) for phase, seconds in self.phase_seconds.items()}
+        return stats
+
+    # get the stats as JSON text, it is also written to the file at path when one is given
+    def to_json(self, path=None):
+        import json
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text + "\n")
+        return text
+
+    # output the stats, with the share of the search time spent in each phase when timed
+    def output(self):
+        print("\n\nSTATISTICS\n-------------------------------------")
+        print("Nodes generated         : {:,}".format(self.num_nodes_generated))
+        print("Nodes expanded          : {:,}".format(self.num_nodes_expanded))
+        print("Duplicates dropped      : {:,}".format(self.num_duplicates))
+        print("States re-opened        : {:,}".format(self.num_reopened))
+        print("Frontier high-water mark: {:,}".format(self.max_frontier_size))
+        print("Closed high-water mark  : {:,}".format(self.max_closed_size))
+        print("Seconds                 : {:.3f}".format(self.seconds))
+        print("Nodes per second        : {:,.0f}".format(self.get_nodes_per_second()))
+        print("Peak memory             : {:.1f} MB".format(self.peak_rss / 2 ** 20))
+
+        if self.timed:
+            for phase in PHASES:
+                seconds = self.phase_seconds[phase]
+                share = seconds / self.seconds if self.seconds > 0 else 0.0
+                print("  {:<22}: {:.3f} s ({:.0%})".format(phase, seconds, share))
+
+
+class TimedHeuristic:
+
+    # a heuristic that adds the time of its updates to the heuristic phase of the stats
+    #   - the updates are made while a child node is created, so their time is taken back out of the expansion phase
+    def __init__(self, heuristic, stats):
+        self.heuristic = heuristic      # the heuristic that is timed, see heuristic.py
+        self.stats = stats              # the stats the time is added to
+        self.name = heuristic.name
+        self.length = heuristic.length
+
+    def evaluate(self, state):
+        return self.heuristic.evaluate(state)
+
+    def update(self, raw, tile, from_index, to_index, child_state):
+        start = time.perf_counter()
+        raw = self.heuristic.update(raw, tile, from_index, to_index, child_state)
+        seconds = time.perf_counter() - start
+
+        phase_seconds = self.stats.phase_seconds
+        phase_seconds["heuristic"] += seconds
+        phase_seconds["expansion"] -= seconds
+        return raw
+
+    def get_cost(self, raw):
+        return self.heuristic.get_cost(raw)
+
+
+# run a search under cProfile
+#   - search is a search object with a solve method, e.g. SearchAlgorithm
+#   - the profile is written to path when one is given (read it with pstats or snakeviz), otherwise the top
+#     functions by cumulative time are printed
+#   - the profiler modules are only imported here, they would slow down the start of every search
+#   - returns the search result
+def profile_search(search, initial_state, goal_state, algorithm_choice, path=None, limit=20):
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(search.solve, initial_state, goal_state, algorithm_choice)
+
+    if path is not None:
+        profiler.dump_stats(path)
+    else:
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(limit)
+        print(text.getvalue())
+
+    return result
+
+
+# command line, python stats.py BOARD [--algorithm 4] [--timed] [--json FILE] [--profile [FILE]]
+#   - BOARD is the tiles in row order, 0 for the blank square, e.g. "8 7 1 6 0 2 5 4 3"
+#   - solves the board with the graph search and outputs its stats
+if __name__ == "__main__":
+    import argparse
+
+    from heuristic import get_default_goal_state
+    from search_algorithm import SearchAlgorithm
+
+    parser = argparse.ArgumentParser(description="Solve a board and output the stats of the graph search.")
+    parser.add_argument("board", help="tiles in row order, 0 for the blank square, e.g. \"8 7 1 6 0 2 5 4 3\"")
+    parser.add_argument("--algorithm", default='4', help="algorithm choice as in the interactive menu (default 4)")
+    parser.add_argument("--frontier", choices=("heap", "bucket"), default="heap", help="frontier type (default heap)")
+    parser.add_argument("--timed", action="store_true", help="time each phase of the search")
+    parser.add_argument("--json", metavar="FILE", help="write the stats to a JSON file")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="",
+                        help="run under cProfile, write the profile to FILE or print the top functions")
+    args = parser.parse_args()
+
+    board = [int(tile) for tile in args.board.replace(",", " ").split()]
+    goal = get_default_goal_state(len(board))
+    search = SearchAlgorithm(frontier_type=args.frontier, timed=args.timed)
+
+    if args.profile is None:
+        result = search.solve(board, goal, args.algorithm)
+    else:
+        result = profile_search(search, board, goal, args.algorithm, args.profile or None)
+
+    print("Status: {}, depth: {}".format(result.status, result.depth))
+    search.stats.output()
+    if args.json is not None:
+        search.stats.to_json(args.json)
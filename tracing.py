@@ -0,0 +1,73 @@
+"""
+
+"""
+
+import sys
+from math import isqrt
+
+
+# verbosity levels of a search
+QUIET = 0           # no output
+SUMMARY = 1         # a header when the search begins
+EXPANSIONS = 2      # also every expanded node, as text
+
+
+class ExpansionEvent:
+
+    __slots__ = ("number", "state", "path_cost", "heuristic_cost", "estimated_cost")
+
+    def __init__(self, number, state, path_cost, heuristic_cost, estimated_cost):
+        self.number = number                    # the number of nodes expanded before this one
+        self.state = state                      # the state of the expanded node, a list of integers
+        self.path_cost = path_cost              # g(n)
+        self.heuristic_cost = heuristic_cost    # h(n)
+        self.estimated_cost = estimated_cost    # f(n) = g(n) + h(n)
+
+
+class Tracer:
+
+    # sends an event for every k-th expanded node to a sink, a callable that takes an ExpansionEvent
+    #   - the search only calls the tracer when one is set, with no tracer the search loop does no tracing work
+    def __init__(self, sink=None, every=1):
+        self.sink = write_expansion if sink is None else sink   # the callable that receives the events
+        self.every = every                                      # sample one of every k expansions
+
+    # called by the search for every expanded node, number is the number of nodes expanded before it
+    def __call__(self, node, number):
+        if number % self.every == 0:
+            path_cost, heuristic_cost = node.get_path_heuristic_costs()
+            self.sink(ExpansionEvent(number, node.get_state(), path_cost, heuristic_cost, node.get_estimated_cost()))
+
+
+class RecordingSink:
+
+    # keeps the events in a list, e.g. to inspect a search afterwards
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+# the text sink, writes the expanded node with g(n) and h(n) as the search has always printed it
+#   - the text of one node is written with one call
+def write_expansion(event, file=None):
+    num_row_col = isqrt(len(event.state))
+
+    # output a message depending on if the node is the start state (path_cost == 0), or not
+    if event.path_cost == 0:
+        lines = ["Expanding state"]
+    else:
+        lines = ["\n\nThe node to expand has g(n) = {}, h(n) = {}".format(event.path_cost, event.heuristic_cost)]
+
+    # the state in a NxN matrix format
+    for row in range(num_row_col):
+        lines.append("".join("{} ".format(tile) for tile in event.state[row * num_row_col:(row + 1) * num_row_col]))
+
+    text = "\n".join(lines)
+
+    # output message if not in the start state (path_cost == 0)
+    if event.path_cost != 0:
+        text += "\t\tExpanding this node ...\n"
+
+    (sys.stdout if file is None else file).write(text)
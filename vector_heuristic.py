@@ -0,0 +1,170 @@
+"""
+
+"""
+
+import argparse
+import random
+import time
+from functools import lru_cache
+
+from board import decode_state, get_move_table, get_tile_bits
+from heuristic import (LinearConflictHeuristic, TileHeuristic, build_linear_conflict, get_default_goal_state,
+                       get_heuristic)
+
+# NumPy is optional, it is only needed by this module
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# get the numpy module, with an error that says how to get it when it is not installed
+def require_numpy():
+    if numpy is None:
+        raise ImportError("the vectorized heuristics need NumPy, install it with 'pip install numpy'")
+    return numpy
+
+
+# stack states of the same length as the rows of a uint8 matrix
+#   - states are lists of tiles, or packed integers (see board.py) when the board length is given
+#   - packed states that fit in 64 bits (up to 4x4) are unpacked with shifts over the whole batch at once
+def stack_states(states, length=None):
+    np = require_numpy()
+    if length is None:
+        return np.array(states, dtype=np.uint8)
+
+    bits = get_tile_bits(length)
+    if length * bits > 64:
+        return np.array([decode_state(packed, length, bits) for packed in states], dtype=np.uint8)
+
+    packed = np.array(states, dtype=np.uint64).reshape(-1, 1)
+    shifts = (np.arange(length, dtype=np.uint64) * np.uint64(bits)).reshape(1, -1)
+    return ((packed >> shifts) & np.uint64((1 << bits) - 1)).astype(np.uint8)
+
+
+# get the child states of a state as the rows of a uint8 matrix, with the move that made each child
+def get_child_states(state):
+    np = require_numpy()
+    blank_index = state.index(0)
+    moves = get_move_table(len(state))[blank_index]
+
+    children = np.tile(np.array(state, dtype=np.uint8), (len(moves), 1))
+    for row, (target_index, move) in enumerate(moves):
+        children[row, blank_index] = state[target_index]
+        children[row, target_index] = 0
+
+    return children, [move for target_index, move in moves]
+
+
+class VectorHeuristic:
+
+    # the vectorized version of a heuristic of heuristic.py, it evaluates a whole matrix of states in one call
+    #   - it is built from the tables of the scalar heuristic, so the raw values are the same, bit for bit
+    #   - sums of tile costs (misplaced tile, euclidean and manhattan distance) and linear conflict can be vectorized
+    def __init__(self, heuristic):
+        np = require_numpy()
+        if not isinstance(heuristic, TileHeuristic):
+            raise TypeError("the {} heuristic cannot be vectorized".format(heuristic.name))
+
+        self.name = heuristic.name      # the name of the heuristic
+        self.length = heuristic.length  # the number of squares on the board
+        self.shift = heuristic.shift    # fraction bits of the raw values
+
+        # table[tile, index], the raw cost of the tile when it is at the index
+        self.table = np.array(heuristic.table, dtype=np.int64)
+        self.indexes = np.arange(self.length)
+
+        # goal row and column of each tile, -1 for the blank square so it is never in its goal line
+        self.linear_conflict = isinstance(heuristic, LinearConflictHeuristic)
+        if self.linear_conflict:
+            goal_row_col = np.array(heuristic.goal_row_col, dtype=np.int64)
+            goal_row_col[0] = -1
+            self.goal_lines = (goal_row_col[:, 0], goal_row_col[:, 1])
+            self.lines = [np.array(lines) for lines in heuristic.lines]
+
+    # full evaluation of the raw costs of a uint8 matrix of states, one state per row
+    #   - returns an int64 array with the raw cost of each row
+    def evaluate(self, states):
+        raw = self.table[states, self.indexes].sum(axis=1)
+        if self.linear_conflict:
+            raw += 2 * self.get_conflicts(states)
+        return raw
+
+    # get the number of tiles that have to leave their goal line, for each row, see LinearConflictHeuristic
+    #   - the longest run in goal order is found with the O(N^2) dynamic program, one column of the batch at a time
+    def get_conflicts(self, states):
+        np = require_numpy()
+        count = len(states)
+        conflicts = np.zeros(count, dtype=np.int64)
+
+        for axis in (0, 1):
+            goal_lines, goal_positions = self.goal_lines[axis], self.goal_lines[1 - axis]
+
+            for line, indexes in enumerate(self.lines[axis]):
+                tiles = states[:, indexes]
+                in_line = goal_lines[tiles] == line
+                positions = goal_positions[tiles]
+
+                # longest[:, i], the longest run in goal order that ends at square i of the line, 0 if its tile
+                # is not in its goal line
+                longest = np.zeros((count, len(indexes)), dtype=np.int64)
+                for i in range(len(indexes)):
+                    best = np.zeros(count, dtype=np.int64)
+                    for j in range(i):
+                        best = np.maximum(best, np.where(positions[:, j] < positions[:, i], longest[:, j], 0))
+                    longest[:, i] = np.where(in_line[:, i], best + 1, 0)
+
+                conflicts += in_line.sum(axis=1) - longest.max(axis=1)
+
+        return conflicts
+
+    # get the heuristic costs h(n) from raw costs
+    def get_costs(self, raw):
+        return raw >> self.shift
+
+
+# get the vectorized heuristic of an algorithm choice, the tables are built once and shared
+#   - goal_state is a tuple, None for the default goal state
+@lru_cache(maxsize=16)
+def get_vector_heuristic(algorithm_choice, length, goal_state=None):
+    return VectorHeuristic(get_heuristic(algorithm_choice, length, goal_state))
+
+
+# evaluate the children of a state in one call
+#   - returns the uint8 matrix of child states, the move that made each child and their heuristic costs h(n)
+def evaluate_children(state, heuristic):
+    children, moves = get_child_states(state)
+    return children, moves, heuristic.get_costs(heuristic.evaluate(children))
+
+
+# command line, python vector_heuristic.py [--size 4] [--count 100000]
+#   - checks the vectorized heuristics against the scalar heuristics on random states and times both
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the vectorized heuristics.")
+    parser.add_argument("--size", type=int, default=4, help="number of rows and columns (default 4)")
+    parser.add_argument("--count", type=int, default=100000, help="number of random states (default 100000)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    args = parser.parse_args()
+
+    length = args.size * args.size
+    goal = get_default_goal_state(length)
+    rng = random.Random(args.seed)
+    states = [rng.sample(range(length), length) for _ in range(args.count)]
+    matrix = stack_states(states)
+
+    scalar_heuristics = [get_heuristic(choice, length) for choice in ('2', '3', '4')]
+    scalar_heuristics.append(build_linear_conflict(length, goal))
+
+    for scalar in scalar_heuristics:
+        start_time = time.perf_counter()
+        expected = [scalar.evaluate(state) for state in states]
+        scalar_seconds = time.perf_counter() - start_time
+
+        vector = VectorHeuristic(scalar)
+        start_time = time.perf_counter()
+        raw = vector.evaluate(matrix)
+        vector_seconds = time.perf_counter() - start_time
+
+        mismatches = sum(1 for value, check in zip(raw.tolist(), expected) if value != check)
+        print("{:<20} {:,} mismatches  scalar {:.3f} s  vectorized {:.3f} s  speedup {:.1f}x".format(
+            scalar.name, mismatches, scalar_seconds, vector_seconds, scalar_seconds / max(vector_seconds, 1e-9)))